@@ -0,0 +1,178 @@
+"""
+Dashboard analytics without Streamlit: every chart's data as a function of
+a filter spec, so the views can run headless, be benchmarked and be
+profiled. A filter spec is a dict of dimension -> value (see
+filter_index.DIMENSIONS); "All" or a missing key means no filter.
+
+Each view runs inside a profiling.stage, so an active RunTimer records
+where the time went.
+
+Usage:
+    python analytics.py [sales file] [--profile]
+"""
+import sys
+import threading
+
+from cube import AggregateCube
+from filter_index import FilterIndex
+from flips import FlipEngine, can_detect_flips, DEFAULT_HOLDING_WINDOW
+from indicators import growth_indicators_for
+from profiling import RunTimer, stage
+from repeat_sales import RepeatSalesIndex
+
+# Trend interval label -> column of the trend frame
+INTERVALS = {'Yearly': 'Year', 'Quarterly': 'Quarter', 'Monthly': 'MonthYear'}
+TOP_N = 10
+
+
+class DashboardAnalytics:
+    """
+    The precomputed structures behind the dashboard for one dataset: the
+    filter index and aggregate cube are built up front, the flip engine and
+    repeat-sales index on first use. One instance is shared by all sessions.
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.columns = list(df.columns)
+        self.n_rows = len(df)
+        with stage('filter index build'):
+            self.index = FilterIndex(df)
+        with stage('cube build'):
+            self.cube = AggregateCube(df, self.index)
+        self.has_flips = can_detect_flips(df)
+        self._flips = None
+        self._repeat_sales = None
+        self._lock = threading.Lock()
+
+    @property
+    def flips(self):
+        with self._lock:
+            if self._flips is None:
+                with stage('flip engine build'):
+                    self._flips = FlipEngine(self.df)
+        return self._flips
+
+    @property
+    def repeat_sales(self):
+        flips = self.flips
+        with self._lock:
+            if self._repeat_sales is None:
+                with stage('repeat-sales index build'):
+                    self._repeat_sales = RepeatSalesIndex(self.df, flips)
+        return self._repeat_sales
+
+    def carry_over(self, previous):
+        """
+        When this instance serves a refreshed dataset, take over the
+        repeat-sales index of the previous one, updated for the changed rows
+        instead of rebuilt (see RepeatSalesIndex.update). Nothing to do if
+        it was never built.
+        """
+        with previous._lock:
+            repeat_sales = previous._repeat_sales
+        if repeat_sales is None:
+            return
+        df = self.df
+        with stage('flip engine build'):
+            flips = FlipEngine(df)
+        with stage('repeat-sales index update'):
+            repeat_sales = repeat_sales.updated(df, flips)
+        with self._lock:
+            self._flips, self._repeat_sales = flips, repeat_sales
+
+    def options(self, dim, spec):
+        """
+        Values of dim still available under spec, sorted, without "All".
+        """
+        return self.index.options(dim, spec)
+
+    def select(self, spec):
+        with stage('filter rows'):
+            return self.index.select(self.df, spec)
+
+    def metrics(self, spec):
+        """
+        Total transactions, mean Price and Rate, and the number of dated
+        transactions (a dict, see AggregateCube.totals).
+        """
+        with stage('metrics'):
+            return self.cube.totals(spec)
+
+    def trend(self, spec, interval='Yearly'):
+        """
+        Mean Price and Rate per period; the period column is named
+        INTERVALS[interval].
+        """
+        with stage(f'trend ({interval.lower()})'):
+            by = INTERVALS[interval]
+            trend_df = self.cube.rollup('Month' if by == 'MonthYear' else by, spec)
+            return trend_df.rename(columns={'Month': 'MonthYear'})
+
+    def top_areas(self, spec, by, measure='Rate (AED/sqm)', n=TOP_N):
+        """
+        The n values of by (District, Community, Project) with the highest
+        mean measure.
+        """
+        with stage(f'top {by.lower()}'):
+            return self.cube.top(by, measure, spec, n)
+
+    def growth_indicators(self, spec):
+        """
+        Offplan/Ready ratio and QoQ/YoY sales growth ('ratio', 'qoq', 'yoy').
+        """
+        with stage('growth indicators'):
+            return growth_indicators_for(self.cube, spec)
+
+    def flip_stats(self, spec, window_days=DEFAULT_HOLDING_WINDOW):
+        """
+        Quarterly flip rate and flip appreciation as (flip_df, apprec_df).
+        """
+        flips = self.flips
+        with stage('flip stats'):
+            same_year = spec.get('Year', "All") != "All"
+            return flips.stats(self.index.rows(spec), window_days, same_year_only=same_year)
+
+    def repeat_sales_index(self, spec, asset_type="All"):
+        """
+        Repeat-sales price index for the District / Community of spec.
+        """
+        index = self.repeat_sales
+        with stage('repeat-sales index'):
+            return index.index(spec.get('District', "All"), spec.get('Community', "All"), asset_type)
+
+
+def run_all(analytics, spec):
+    """
+    Every dashboard view for one filter spec, as the app computes them.
+    """
+    views = {'metrics': analytics.metrics(spec)}
+    for interval in INTERVALS:
+        views[f'trend {interval}'] = analytics.trend(spec, interval)
+    for by in ['District', 'Community', 'Project']:
+        views[f'top {by}'] = analytics.top_areas(spec, by)
+    views['growth'] = analytics.growth_indicators(spec)
+    if analytics.has_flips:
+        views['flips'] = analytics.flip_stats(spec)
+        views['repeat-sales'] = analytics.repeat_sales_index(spec)
+    return views
+
+
+if __name__ == "__main__":
+    from data_loader import load_data
+
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    timer = RunTimer(profile='--profile' in sys.argv)
+    with timer:
+        with stage('load data'):
+            df, error = load_data(args[0] if args else 'recent_sales.txt')
+        if df is None:
+            sys.exit(error)
+        with stage('build'):
+            analytics = DashboardAnalytics(df)
+        with stage('views (All)'):
+            run_all(analytics, {})
+    for row in timer.report().itertuples(index=False):
+        print(f"{row.Stage:<32}{row.ms:>10,.1f} ms{row[2]:>7.1f}%")
+    if '--profile' in sys.argv:
+        print(timer.profile_stats())
@@ -1,262 +1,341 @@
 import streamlit as st
 import pandas as pd
-import numpy as np
-import plotly.express as px
 import plotly.graph_objects as go
-from data_loader import load_data
+import glob
+import os
+import threading
+from data_loader import CACHE_DIR_NAME, LOAD_MEMORY_MB, cache_key, expand_sources, ingest, load_data
+from analytics import DashboardAnalytics, INTERVALS
+import charts
+from charts import FigureCache, filter_key
+from indicators import popular_selections
+from flips import HOLDING_WINDOWS, DEFAULT_HOLDING_WINDOW
+from profiling import RunTimer, stage
+from sql_backend import DuckDBAnalytics, HAS_DUCKDB
+from shared_data import frame_nbytes
 
 st.set_page_config(page_title="Real Estate Dashboard", layout="wide")
 
+# Every rerun is timed per stage; the breakdown is shown in the sidebar debug panel
+timer = RunTimer(profile=st.session_state.get("profile_rerun", False)).start()
+
 st.title("Abu Dhabi Real Estate Market Dashboard")
 st.markdown("<p style='font-size: 18px;'>Developed by Lipei Zhang</p>", unsafe_allow_html=True)
 
-@st.cache_data
-def get_data():
-    file_path = "recent_sales.txt" 
-    return load_data(file_path)
-
-df, error = get_data()
-
-if df is None:
+SALES_SOURCE = os.environ.get("SALES_SOURCE", "recent_sales.txt")
+
+def delta_paths():
+    # Daily batches dropped in sales_deltas/ are cleaned and merged incrementally
+    return sorted(glob.glob("sales_deltas/*.txt") + glob.glob("sales_deltas/*.csv"))
+
+def load_sales(progress=None):
+    # SALES_SOURCE may point at a directory or glob of shards, loaded in parallel
+    # Large files are parsed and cleaned in chunks within LOAD_MEMORY_MB of working memory
+    memory_mb = float(os.environ.get("LOAD_MEMORY_MB", LOAD_MEMORY_MB))
+    if expand_sources(SALES_SOURCE) != [SALES_SOURCE]:
+        return load_data(SALES_SOURCE, memory_mb=memory_mb, progress=progress)
+    return ingest(SALES_SOURCE, delta_paths(), memory_mb=memory_mb, progress=progress)
+
+def load_frame():
+    # The DuckDB backend reloads the frame (memory-mapped from the cache) for the repeat-sales index
+    data, error = load_sales()
+    if data is None:
+        raise RuntimeError(error)
+    return data
+
+def build_analytics(data):
+    # ANALYTICS_BACKEND=duckdb answers the filters and aggregations with SQL on
+    # a local database file, and the pandas frame is not kept in memory.
+    if os.environ.get("ANALYTICS_BACKEND", "pandas") == "duckdb":
+        if HAS_DUCKDB:
+            try:
+                return DuckDBAnalytics(data, CACHE_DIR_NAME, key=cache_key(SALES_SOURCE), load=load_frame)
+            except Exception as e:
+                print(f"Could not open the DuckDB database, using pandas: {e}")
+                return DashboardAnalytics(data)
+        print("ANALYTICS_BACKEND=duckdb but duckdb is not installed; using pandas.")
+    return DashboardAnalytics(data)
+
+# The sources are checked for changes at most every REFRESH_SECONDS, so rows
+# appended to the sales file or dropped in sales_deltas/ are served without a restart
+REFRESH_SECONDS = float(os.environ.get("REFRESH_SECONDS", 300))
+
+@st.cache_data(ttl=REFRESH_SECONDS, show_spinner=False)
+def sources_signature():
+    signature = []
+    for path in expand_sources(SALES_SOURCE) + delta_paths():
+        try:
+            stat = os.stat(path)
+            signature.append((path, stat.st_size, stat.st_mtime_ns))
+        except OSError:
+            signature.append((path, None, None))
+    return signature
+
+# The data is loaded once per server process and shared read-only by every
+# session: no per-rerun copy (st.cache_data would unpickle a full copy on every
+# call). Sessions select rows by position instead of changing the frame.
+@st.cache_resource
+def get_dataset():
+    return {'lock': threading.Lock(), 'signature': None, 'key': None, 'current': (None, None, 0)}
+
+def current_analytics():
+    # (analytics, error, version) for the current sources. After a change one
+    # session reloads them and builds refreshed analytics while the others keep
+    # using the previous ones; version counts the refreshes and keys the caches below.
+    dataset = get_dataset()
+    signature = sources_signature()
+    if dataset['signature'] == signature:
+        return dataset['current']
+    # Sessions wait for the first load, not for a refresh
+    if not dataset['lock'].acquire(blocking=dataset['current'][0] is None):
+        return dataset['current']
+    try:
+        if dataset['signature'] != signature:
+            bar = st.progress(0.0, text="Loading sales data...")
+            data, error = load_sales(bar.progress)
+            bar.empty()
+            previous, _, version = dataset['current']
+            key = cache_key(SALES_SOURCE)
+            if data is None:
+                # A failed refresh keeps serving the previous data
+                dataset['current'] = (previous, error, version)
+            elif previous is None or key is None or key != dataset['key']:
+                analytics = build_analytics(data)
+                if previous is not None:
+                    analytics.carry_over(previous)
+                dataset['current'] = (analytics, None, version + 1)
+                dataset['key'] = key
+            dataset['signature'] = signature
+    finally:
+        dataset['lock'].release()
+    return dataset['current']
+
+with stage('load data and build analytics'):
+    analytics, error, data_version = current_analytics()
+
+if analytics is None:
+    timer.stop()
     st.error(f"Failed to load data. {error}")
     st.info("Check if 'recent_sales.txt' is in your GitHub repository and its size in GitHub.")
     st.stop()
 
-# --- Pre-processing for Tabs ---
-if 'Registration' in df.columns and pd.api.types.is_datetime64_any_dtype(df['Registration']):
-    df['Year'] = df['Registration'].dt.year
-    df['Quarter'] = df['Registration'].dt.to_period('Q').astype(str)
-
-# Top level navigation
-main_tab1, main_tab2 = st.tabs(["Real Estate Transaction Dashboard", "Real Estate Growth Indicators"])
+# Top level navigation. Switching tabs reruns the script, and only the open tab
+# computes and renders anything (see the .open checks below)
+main_tab1, main_tab2 = st.tabs(["Real Estate Transaction Dashboard", "Real Estate Growth Indicators"],
+                               key="main_tab", on_change="rerun")
+
+@st.cache_resource(max_entries=1)
+def get_figure_cache(data_version):
+    # Figures per chart and filter state, shared by all sessions
+    return FigureCache()
+
+figures = get_figure_cache(data_version)
+
+# Growth indicators only depend on the geography selection. Results are kept
+# per selection (least recently used entries evicted, expired after an hour),
+# so tab-1 interactions and revisited selections do not recompute them.
+@st.cache_data(max_entries=256, ttl=3600, show_spinner=False)
+def get_growth_indicators(district, community, project, year, data_version):
+    selection = {'District': district, 'Community': community, 'Project': project, 'Year': year}
+    return analytics.growth_indicators(selection)
+
+@st.cache_resource(max_entries=1, show_spinner="Precomputing growth indicators...")
+def precompute_growth_indicators(data_version):
+    # Warm the cache for the most viewed selections so the first switch to tab 2 is instant
+    for key in popular_selections(analytics.cube):
+        get_growth_indicators(*key, data_version)
+    return True
+
+with stage('precompute growth indicators'):
+    precompute_growth_indicators(data_version)
+
+@st.cache_data(max_entries=256, ttl=3600, show_spinner=False)
+def get_flip_stats(district, community, project, year, window_days, data_version):
+    selection = {'District': district, 'Community': community, 'Project': project, 'Year': year}
+    return analytics.flip_stats(selection, window_days)
+
+# The bar and pie charts rank the same areas; rank them once per view
+@st.cache_data(max_entries=256, ttl=3600, show_spinner=False)
+def get_top_areas(by, view_key, data_version):
+    return analytics.top_areas(dict(view_key), by)
 
 # --- Sidebar Filters (Shared) ---
-st.sidebar.header("Geography Filters")
-
-# We want geography filters to apply to both tabs
-districts = ["All"] + sorted(df['District'].dropna().unique().tolist())
-selected_district = st.sidebar.selectbox("District", districts)
-
-geo_filtered_df = df.copy()
-if selected_district != "All":
-    geo_filtered_df = geo_filtered_df[geo_filtered_df['District'] == selected_district]
-
-communities = ["All"] + sorted(geo_filtered_df['Community'].dropna().unique().tolist())
-selected_community = st.sidebar.selectbox("Community", communities)
-
-if selected_community != "All":
-    geo_filtered_df = geo_filtered_df[geo_filtered_df['Community'] == selected_community]
-
-projects = ["All"] + sorted(geo_filtered_df['Project'].dropna().unique().tolist())
-selected_project = st.sidebar.selectbox("Project", projects)
-
-if selected_project != "All":
-    geo_filtered_df = geo_filtered_df[geo_filtered_df['Project'] == selected_project]
-
-# Registration Year Filter
-if 'Year' in geo_filtered_df.columns:
-    years = ["All"] + sorted(geo_filtered_df['Year'].dropna().unique().astype(int).tolist())
-    selected_year = st.sidebar.selectbox("Select Year", years)
-    if selected_year != "All":
-        geo_filtered_df = geo_filtered_df[geo_filtered_df['Year'] == selected_year]
-
-
-with main_tab1:
+with stage('sidebar filters'):
+    st.sidebar.header("Geography Filters")
+
+    # We want geography filters to apply to both tabs
+    # Options and matching rows come from the precomputed filter index
+    geo_selection = {}
+    districts = ["All"] + analytics.options('District', geo_selection)
+    selected_district = st.sidebar.selectbox("District", districts)
+    geo_selection['District'] = selected_district
+
+    communities = ["All"] + analytics.options('Community', geo_selection)
+    selected_community = st.sidebar.selectbox("Community", communities)
+    geo_selection['Community'] = selected_community
+
+    projects = ["All"] + analytics.options('Project', geo_selection)
+    selected_project = st.sidebar.selectbox("Project", projects)
+    geo_selection['Project'] = selected_project
+
+    # Registration Year Filter
+    if 'Year' in analytics.columns:
+        years = ["All"] + analytics.options('Year', geo_selection)
+        selected_year = st.sidebar.selectbox("Select Year", years)
+        geo_selection['Year'] = selected_year
+
+
+# Each tab body is a fragment: its own widgets rerun only that tab, and the
+# sidebar reruns the whole script but only the open tab executes.
+@st.fragment
+def transactions_tab():
     st.header("Transaction Analysis")
     
     # Sub-filters specific to this tab
     st.markdown("### Detail Filters")
     col_f1, col_f2, col_f3, col_f4 = st.columns(4)
+    tab1_selection = dict(geo_selection)
     
     with col_f1:
-        asset_types = ["All"] + sorted(geo_filtered_df['Asset Type'].dropna().unique().tolist())
+        asset_types = ["All"] + analytics.options('Asset Type', tab1_selection)
         selected_asset_type = st.selectbox("Asset Type", asset_types)
-        tab1_df = geo_filtered_df.copy()
-        if selected_asset_type != "All":
-            tab1_df = tab1_df[tab1_df['Asset Type'] == selected_asset_type]
+        tab1_selection['Asset Type'] = selected_asset_type
 
     with col_f2:
-        property_types = ["All"] + sorted(tab1_df['Property Type'].dropna().unique().tolist())
+        property_types = ["All"] + analytics.options('Property Type', tab1_selection)
         selected_property_type = st.selectbox("Property Type", property_types)
-        if selected_property_type != "All":
-            tab1_df = tab1_df[tab1_df['Property Type'] == selected_property_type]
+        tab1_selection['Property Type'] = selected_property_type
 
     with col_f3:
-        sale_types = ["All"] + sorted(tab1_df['Sale Type'].dropna().unique().tolist())
+        sale_types = ["All"] + analytics.options('Sale Type', tab1_selection)
         selected_sale_type = st.selectbox("Sale Type", sale_types)
-        if selected_sale_type != "All":
-            tab1_df = tab1_df[tab1_df['Sale Type'] == selected_sale_type]
+        tab1_selection['Sale Type'] = selected_sale_type
 
     with col_f4:
-        sequences = ["All"] + sorted(tab1_df['Sequence'].dropna().unique().tolist())
+        sequences = ["All"] + analytics.options('Sequence', tab1_selection)
         selected_sequence = st.selectbox("Sequence", sequences)
-        if selected_sequence != "All":
-            tab1_df = tab1_df[tab1_df['Sequence'] == selected_sequence]
+        tab1_selection['Sequence'] = selected_sequence
+
+    # Metrics and charts on this tab are rolled up from the pre-aggregated cube;
+    # figures are cached per filter state, so revisited views skip both steps
+    totals = analytics.metrics(tab1_selection)
+    view_key = filter_key(tab1_selection)
 
     # Main Metrics
     m1, m2, m3 = st.columns(3)
     with m1:
-        st.metric("Total Transactions", len(tab1_df))
+        st.metric("Total Transactions", totals['transactions'])
     with m2:
-        avg_price = tab1_df['Price (AED)'].mean()
+        avg_price = totals['Price (AED)']
         st.metric("Average Price", f"AED {avg_price:,.0f}" if not pd.isna(avg_price) else "-")
     with m3:
-        avg_rate = tab1_df['Rate (AED/sqm)'].mean()
+        avg_rate = totals['Rate (AED/sqm)']
         st.metric("Average Rate (AED/sqm)", f"{avg_rate:,.2f}" if not pd.isna(avg_rate) else "-")
 
     # Time Series
     st.subheader("Price & Rate Trends")
     interval = st.radio("Select Interval", ["Yearly", "Quarterly", "Monthly"], horizontal=True, key="tab1_interval")
 
-    if 'Registration' in tab1_df.columns and not tab1_df['Registration'].isna().all():
-        if interval == "Yearly": group_col = 'Year'
-        elif interval == "Quarterly": group_col = 'Quarter'
-        else:
-            tab1_df['MonthYear'] = tab1_df['Registration'].dt.to_period('M').astype(str)
-            group_col = 'MonthYear'
-            
-        trend_df = tab1_df.groupby(group_col)[['Price (AED)', 'Rate (AED/sqm)']].mean().reset_index()
+    if totals['dated'] > 0:
+        group_col = INTERVALS[interval]
         col_t1, col_t2 = st.columns(2)
         with col_t1:
-            st.plotly_chart(px.line(trend_df, x=group_col, y='Price (AED)', title=f'Avg Price ({interval})'), use_container_width=True)
+            fig = figures.get(('trend price', interval, view_key), lambda: charts.line(
+                analytics.trend(tab1_selection, interval), x=group_col, y='Price (AED)', title=f'Avg Price ({interval})'))
+            st.plotly_chart(fig, use_container_width=True)
         with col_t2:
-            st.plotly_chart(px.line(trend_df, x=group_col, y='Rate (AED/sqm)', title=f'Avg Rate ({interval})'), use_container_width=True)
+            fig = figures.get(('trend rate', interval, view_key), lambda: charts.line(
+                analytics.trend(tab1_selection, interval), x=group_col, y='Rate (AED/sqm)', title=f'Avg Rate ({interval})'))
+            st.plotly_chart(fig, use_container_width=True)
 
     # Area Analysis
     st.subheader("Average Rate per Area")
     c_a1, c_a2 = st.columns(2)
     with c_a1:
-        df_d = tab1_df.groupby('District')['Rate (AED/sqm)'].mean().reset_index().sort_values('Rate (AED/sqm)', ascending=False).head(10)
-        st.plotly_chart(px.bar(df_d, x='District', y='Rate (AED/sqm)', title='Top Districts'), use_container_width=True)
+        fig = figures.get(('top district bar', view_key), lambda: charts.bar(
+            get_top_areas('District', view_key, data_version), x='District', y='Rate (AED/sqm)', title='Top Districts'))
+        st.plotly_chart(fig, use_container_width=True)
     with c_a2:
-        df_c = tab1_df.groupby('Community')['Rate (AED/sqm)'].mean().reset_index().sort_values('Rate (AED/sqm)', ascending=False).head(10)
-        st.plotly_chart(px.bar(df_c, x='Community', y='Rate (AED/sqm)', title='Top Communities'), use_container_width=True)
+        fig = figures.get(('top community bar', view_key), lambda: charts.bar(
+            get_top_areas('Community', view_key, data_version), x='Community', y='Rate (AED/sqm)', title='Top Communities'))
+        st.plotly_chart(fig, use_container_width=True)
 
     # Drill Downs
     st.subheader("Drill Downs")
-    d_tab1, d_tab2, d_tab3 = st.tabs(["District", "Community", "Project"])
-    with d_tab1:
-        dist_df = tab1_df.groupby('District')['Rate (AED/sqm)'].mean().reset_index().sort_values('Rate (AED/sqm)', ascending=False).head(10)
-        st.plotly_chart(px.pie(dist_df, values='Rate (AED/sqm)', names='District', title="Top 10 Districts by Avg Rate"), use_container_width=True)
-    with d_tab2:
-        comm_df = tab1_df.groupby('Community')['Rate (AED/sqm)'].mean().reset_index().sort_values('Rate (AED/sqm)', ascending=False).head(10)
-        st.plotly_chart(px.pie(comm_df, values='Rate (AED/sqm)', names='Community', title="Top 10 Communities by Avg Rate"), use_container_width=True)
-    with d_tab3:
-        proj_df = tab1_df.groupby('Project')['Rate (AED/sqm)'].mean().reset_index().sort_values('Rate (AED/sqm)', ascending=False).head(10)
-        st.plotly_chart(px.pie(proj_df, values='Rate (AED/sqm)', names='Project', title="Top 10 Projects by Avg Rate"), use_container_width=True)
-
-
-with main_tab2:
+    d_tab1, d_tab2, d_tab3 = st.tabs(["District", "Community", "Project"], key="drill_tab", on_change="rerun")
+    if d_tab1.open:
+        with d_tab1:
+            fig = figures.get(('top district pie', view_key), lambda: charts.pie(
+                get_top_areas('District', view_key, data_version), values='Rate (AED/sqm)', names='District', title="Top 10 Districts by Avg Rate"))
+            st.plotly_chart(fig, use_container_width=True)
+    if d_tab2.open:
+        with d_tab2:
+            fig = figures.get(('top community pie', view_key), lambda: charts.pie(
+                get_top_areas('Community', view_key, data_version), values='Rate (AED/sqm)', names='Community', title="Top 10 Communities by Avg Rate"))
+            st.plotly_chart(fig, use_container_width=True)
+    if d_tab3.open:
+        with d_tab3:
+            fig = figures.get(('top project pie', view_key), lambda: charts.pie(
+                get_top_areas('Project', view_key, data_version), values='Rate (AED/sqm)', names='Project', title="Top 10 Projects by Avg Rate"))
+            st.plotly_chart(fig, use_container_width=True)
+
+
+@st.fragment
+def growth_tab():
     st.header("Real Estate Growth Indicators")
     
-    if 'Quarter' not in geo_filtered_df.columns:
+    if 'Quarter' not in analytics.columns:
         st.warning("Date information missing. Indicators cannot be calculated.")
     else:
-        # Calculate Indicators
-        # We need data grouped by Quarter and Asset Type/Sale Type
-        
-        # 1. Ratios: Offplan/Ready
-        # Group by Quarter, Asset Type, Sale Type
-        base_counts = geo_filtered_df.groupby(['Quarter', 'Asset Type', 'Sale Type']).size().reset_index(name='count')
-        
-        def calc_ratio(asset):
-            sub = base_counts[base_counts['Asset Type'] == asset]
-            if sub.empty:
-                # Return empty DF with expected columns filled with NaN to avoid ShapeError
-                quarters = sorted(geo_filtered_df['Quarter'].unique())
-                return pd.DataFrame({f'{asset} Offplan/Ready': [np.nan] * len(quarters)}, index=quarters)
-            
-            pivot = sub.pivot(index='Quarter', columns='Sale Type', values='count').fillna(0)
-            
-            # Ensure both columns exist for calculation
-            for col in ['Off-plan', 'Ready']:
-                if col not in pivot.columns:
-                    pivot[col] = 0
-            
-            pivot[f'{asset} Offplan/Ready'] = pivot['Off-plan'] / pivot['Ready'].replace(0, 1)
-            return pivot[[f'{asset} Offplan/Ready']]
-
-        res_ratio = calc_ratio('Residential')
-        com_ratio = calc_ratio('Commercial')
-        
-        ratio_df = res_ratio.join(com_ratio, how='outer').reset_index().sort_values('Quarter')
-        ratio_df = ratio_df.rename(columns={'index': 'Quarter'}) # Handle index rename from join
-        
-        # Exclude Q1 2026 and format
-        ratio_df = ratio_df[ratio_df['Quarter'] != '2026Q1']
+        # Indicators are memoized per geography selection (see get_growth_indicators)
+        indicators = get_growth_indicators(selected_district, selected_community, selected_project, geo_selection.get('Year', "All"), data_version)
+        geo_key = filter_key(geo_selection)
+        ratio_df = indicators['ratio']
         
         st.subheader("Market Composition: Offplan vs Ready Ratio")
         # Ensure columns exist before plotting to avoid Plotly errors
         y_cols_ratio = [c for c in ['Residential Offplan/Ready', 'Commercial Offplan/Ready'] if c in ratio_df.columns]
         if y_cols_ratio:
-            fig1 = px.line(ratio_df, x='Quarter', y=y_cols_ratio,
-                           title="Offplan to Ready Transaction Ratio", markers=True)
+            fig1 = figures.get(('offplan ratio', geo_key), lambda: charts.line(
+                ratio_df, x='Quarter', y=y_cols_ratio, title="Offplan to Ready Transaction Ratio", markers=True))
             st.plotly_chart(fig1, use_container_width=True)
         else:
             st.info("No data available for Offplan vs Ready Ratio.")
         
         # 2. Growth Rates (QoQ)
-        # Group by Quarter and Asset Type for total sales volume
-        growth_counts = geo_filtered_df.groupby(['Quarter', 'Asset Type']).size().unstack(fill_value=0)
-        
-        # Ensure both columns exist
-        for col in ['Residential', 'Commercial']:
-            if col not in growth_counts.columns:
-                growth_counts[col] = 0
-                
-        qoq_growth = growth_counts.pct_change(fill_method=None) * 100
-        qoq_df = qoq_growth[['Residential', 'Commercial']].rename(columns={
-            'Residential': 'Residential sales growth rate (QoQ)',
-            'Commercial': 'Commercial sales growth rate (QoQ)'
-        }).reset_index().sort_values('Quarter')
-        
-        # Apply filters: Remove Q1 2026 and outliers > 600%
-        qoq_df = qoq_df[qoq_df['Quarter'] != '2026Q1']
-        for col in ['Residential sales growth rate (QoQ)', 'Commercial sales growth rate (QoQ)']:
-            if col in qoq_df.columns:
-                qoq_df.loc[qoq_df[col] > 600, col] = None
+        qoq_df = indicators['qoq']
         
         st.subheader("Sales Growth Momentum (Quarter-on-Quarter)")
         col_g1, col_g2 = st.columns(2)
         with col_g1:
             if 'Residential sales growth rate (QoQ)' in qoq_df.columns:
-                fig2r = px.line(qoq_df, x='Quarter', y='Residential sales growth rate (QoQ)',
-                               title="Residential Sales Growth (QoQ %)", markers=True)
-                fig2r.update_layout(yaxis_ticksuffix="%")
+                fig2r = figures.get(('qoq residential', geo_key), lambda: charts.line(
+                    qoq_df, x='Quarter', y='Residential sales growth rate (QoQ)',
+                    title="Residential Sales Growth (QoQ %)", markers=True, layout={'yaxis_ticksuffix': "%"}))
                 st.plotly_chart(fig2r, use_container_width=True)
         with col_g2:
             if 'Commercial sales growth rate (QoQ)' in qoq_df.columns:
-                fig2c = px.line(qoq_df, x='Quarter', y='Commercial sales growth rate (QoQ)',
-                               title="Commercial Sales Growth (QoQ %)", markers=True)
-                fig2c.update_layout(yaxis_ticksuffix="%")
+                fig2c = figures.get(('qoq commercial', geo_key), lambda: charts.line(
+                    qoq_df, x='Quarter', y='Commercial sales growth rate (QoQ)',
+                    title="Commercial Sales Growth (QoQ %)", markers=True, layout={'yaxis_ticksuffix': "%"}))
                 st.plotly_chart(fig2c, use_container_width=True)
         
         # 3. Growth Rates (YoY)
-        yoy_growth = growth_counts.pct_change(periods=4, fill_method=None) * 100
-        yoy_df = yoy_growth[['Residential', 'Commercial']].rename(columns={
-            'Residential': 'Residential sales growth rate (YoY)',
-            'Commercial': 'Commercial sales growth rate (YoY)'
-        }).reset_index().sort_values('Quarter')
-        
-        # Apply filters: Remove Q1 2026 and outliers > 600%
-        yoy_df = yoy_df[yoy_df['Quarter'] != '2026Q1']
-        for col in ['Residential sales growth rate (YoY)', 'Commercial sales growth rate (YoY)']:
-            if col in yoy_df.columns:
-                yoy_df.loc[yoy_df[col] > 600, col] = None
+        yoy_df = indicators['yoy']
         
         st.subheader("Long-term Market Momentum (Year-on-Year)")
         col_g3, col_g4 = st.columns(2)
         with col_g3:
             if 'Residential sales growth rate (YoY)' in yoy_df.columns:
-                fig3r = px.line(yoy_df, x='Quarter', y='Residential sales growth rate (YoY)',
-                               title="Residential Sales Growth (YoY %)", markers=True)
-                fig3r.update_layout(yaxis_ticksuffix="%")
+                fig3r = figures.get(('yoy residential', geo_key), lambda: charts.line(
+                    yoy_df, x='Quarter', y='Residential sales growth rate (YoY)',
+                    title="Residential Sales Growth (YoY %)", markers=True, layout={'yaxis_ticksuffix': "%"}))
                 st.plotly_chart(fig3r, use_container_width=True)
         with col_g4:
             if 'Commercial sales growth rate (YoY)' in yoy_df.columns:
-                fig3c = px.line(yoy_df, x='Quarter', y='Commercial sales growth rate (YoY)',
-                               title="Commercial Sales Growth (YoY %)", markers=True)
-                fig3c.update_layout(yaxis_ticksuffix="%")
+                fig3c = figures.get(('yoy commercial', geo_key), lambda: charts.line(
+                    yoy_df, x='Quarter', y='Commercial sales growth rate (YoY)',
+                    title="Commercial Sales Growth (YoY %)", markers=True, layout={'yaxis_ticksuffix': "%"}))
                 st.plotly_chart(fig3c, use_container_width=True)
 
         st.info("Growth rates are calculated based on the number of transactions.")
@@ -264,78 +343,77 @@ with main_tab2:
         # 4. Speculation Metrics (Flip Rate & Appreciation)
         st.subheader("Flipping Momentum")
         
-        # Property attributes for identification
-        prop_cols = ['Sold Area (sqm)', 'Plot Area (sqm)', 'Layout', 'District', 'Community', 'Project']
-        available_prop_cols = [c for c in prop_cols if c in geo_filtered_df.columns]
-        
-        if len(available_prop_cols) > 0 and 'Registration' in geo_filtered_df.columns and 'Sequence' in geo_filtered_df.columns:
-            # Sort to identify consecutive transactions
-            df_sorted = geo_filtered_df.sort_values(by=available_prop_cols + ['Registration'])
-            
-            # Identify resales: transactions with Sequence 'Secondary'
-            df_sorted['is_resale'] = (df_sorted['Sequence'] == 'Secondary')
-            
-            # Calculate days since last transaction (of any kind for this property group)
-            df_sorted['prev_reg'] = df_sorted.groupby(available_prop_cols)['Registration'].shift(1)
-            df_sorted['prev_price'] = df_sorted.groupby(available_prop_cols)['Price (AED)'].shift(1)
-            df_sorted['days_since_last'] = (df_sorted['Registration'] - df_sorted['prev_reg']).dt.days
-            
-            # Definition: Flip is a resale > 0 and <= 183 days after the previous sale
-            df_sorted['is_flip'] = df_sorted['is_resale'] & (df_sorted['days_since_last'] > 0) & (df_sorted['days_since_last'] <= 183)
-            
-            # Calculate appreciation for flips
-            df_sorted['appreciation'] = (df_sorted['Price (AED)'] - df_sorted['prev_price']) / df_sorted['prev_price'].replace(0, np.nan)
-            
-            # Group by Quarter
-            # Total Resales = all Secondary transactions in that quarter
-            resale_stats = df_sorted.groupby('Quarter').agg(
-                total_resales=('is_resale', 'sum'),
-                flips=('is_flip', 'sum')
-            ).reset_index()
-            
-            resale_stats['Flip Rate (%)'] = (resale_stats['flips'] / resale_stats['total_resales'].replace(0, 1)) * 100
-            
-            # Appreciation Stats: Mean of filtered flips
-            flips_only = df_sorted[
-                (df_sorted['is_flip']) & 
-                (df_sorted['Price (AED)'] > 10000) & 
-                (df_sorted['prev_price'] > 10000)
-            ].copy()
-            
-            if not flips_only.empty:
-                # Outlier filter for appreciation
-                flips_only = flips_only[(flips_only['appreciation'] < 5) & (flips_only['appreciation'] > -0.8)]
-                apprec_stats = flips_only.groupby('Quarter')['appreciation'].mean().reset_index()
-                apprec_stats['Flip Price Appreciation (%)'] = apprec_stats['appreciation'] * 100
-            else:
-                apprec_stats = pd.DataFrame(columns=['Quarter', 'Flip Price Appreciation (%)'])
-
-            # Filter out current incomplete quarter
-            flip_df = resale_stats[resale_stats['Quarter'] != '2026Q1'].sort_values('Quarter')
-            apprec_df = apprec_stats[apprec_stats['Quarter'] != '2026Q1'].sort_values('Quarter')
+        if analytics.has_flips:
+            # Flip pairs are precomputed once per dataset; only the aggregation depends on the filters
+            holding_window = st.radio("Holding Window (days)", HOLDING_WINDOWS,
+                                      index=HOLDING_WINDOWS.index(DEFAULT_HOLDING_WINDOW), horizontal=True, key="flip_window")
+            flip_df, apprec_df = get_flip_stats(selected_district, selected_community, selected_project,
+                                                geo_selection.get('Year', "All"), holding_window, data_version)
             
             col_f1, col_f2 = st.columns(2)
             with col_f1:
                 if not flip_df.empty and flip_df['total_resales'].sum() > 0:
-                    fig4 = px.line(flip_df, x='Quarter', y='Flip Rate (%)',
-                                   title="Flip Rate (Resales ≤ 183 Days)",
-                                   markers=True)
-                    fig4.update_layout(yaxis_ticksuffix="%")
+                    fig4 = figures.get(('flip rate', holding_window, geo_key), lambda: charts.line(
+                        flip_df, x='Quarter', y='Flip Rate (%)', title=f"Flip Rate (Resales ≤ {holding_window} Days)",
+                        markers=True, layout={'yaxis_ticksuffix': "%"}))
                     st.plotly_chart(fig4, use_container_width=True)
                 else:
                     st.info("No resale data available for Flip Rate.")
             
             with col_f2:
                 if not apprec_df.empty:
-                    fig5 = px.line(apprec_df, x='Quarter', y='Flip Price Appreciation (%)',
-                                   title="Flip Price Appreciation (Mean %)",
-                                   markers=True)
-                    fig5.update_layout(yaxis_ticksuffix="%")
+                    fig5 = figures.get(('flip appreciation', holding_window, geo_key), lambda: charts.line(
+                        apprec_df, x='Quarter', y='Flip Price Appreciation (%)', title="Flip Price Appreciation (Mean %)",
+                        markers=True, layout={'yaxis_ticksuffix': "%"}))
                     st.plotly_chart(fig5, use_container_width=True)
                 else:
                     st.info("No market-rate flip transactions detected for appreciation.")
 
-            st.caption("Flip Rate = (Resales ≤ 183 days / Total Resales) × 100. Total Resales are transactions with 'Secondary' sequence. Properties are identified by Area, Layout, and Project attributes.")
+            st.caption(f"Flip Rate = (Resales ≤ {holding_window} days / Total Resales) × 100. Total Resales are transactions with 'Secondary' sequence. Properties are identified by Area, Layout, and Project attributes.")
         else:
             st.warning("Insufficient data (Missing 'Sequence' or Attributes) to calculate Speculation metrics.")
 
+        # 5. Repeat-Sales Price Index
+        st.subheader("Repeat-Sales Price Index")
+        if analytics.has_flips:
+            index_asset_types = ["All"] + analytics.options('Asset Type', {})
+            index_asset_type = st.radio("Index Asset Type", index_asset_types, horizontal=True, key="rsi_asset_type")
+            # Segments are regressed on first view and cached inside the index
+            rsi_df = analytics.repeat_sales_index(geo_selection, index_asset_type)
+            if not rsi_df.empty:
+                fig6 = figures.get(('repeat-sales index', index_asset_type, geo_key), lambda: charts.line(
+                    rsi_df, x='Quarter', y='Repeat-Sales Index', title="Repeat-Sales Price Index (First Quarter = 100)",
+                    markers=True, hover_data=['pairs']))
+                st.plotly_chart(fig6, use_container_width=True)
+            else:
+                st.info("Not enough repeat sales in this segment to build a price index.")
+            st.caption("The index compares each property's sale price with its previous sale, so it is not skewed by which communities traded in a quarter. It follows the District and Community filters. The Project and Year filters do not apply.")
+
+
+if main_tab1.open:
+    with main_tab1, stage('tab 1'):
+        transactions_tab()
+
+if main_tab2.open:
+    with main_tab2, stage('tab 2'):
+        growth_tab()
+
+
+# --- Debug Panel ---
+@st.cache_resource(max_entries=1)
+def get_dataset_caption(data_version):
+    if isinstance(analytics, DuckDBAnalytics):
+        return f"Dataset: {analytics.n_rows:,} rows in {analytics.db_path}, queried by all sessions."
+    return f"Dataset: {analytics.n_rows:,} rows, {frame_nbytes(analytics.df) / 1e6:,.1f} MB held once and shared by all sessions."
+
+timer.stop()
+with st.sidebar.expander("Debug: rerun timings"):
+    st.checkbox("Profile reruns with cProfile", key="profile_rerun")
+    st.caption(get_dataset_caption(data_version))
+    st.caption(f"Last full rerun took {timer.total_ms:,.0f} ms (this panel excluded). Reruns of a single tab's widgets are not listed.")
+    if timer.profile_skipped:
+        st.caption("cProfile was busy with another session's rerun, so this rerun was timed but not profiled.")
+    st.dataframe(timer.report().style.format({'ms': '{:,.1f}', '% of run': '{:.1f}%'}), hide_index=True, width='stretch')
+    profile_stats = timer.profile_stats()
+    if profile_stats:
+        st.code(profile_stats, language=None)
@@ -0,0 +1,90 @@
+"""
+Benchmark the chart data layer (charts.py) against plain plotly.express.
+
+Builds each chart from synthetic sales data twice, once handing every point
+to plotly.express and once through the point budget, and reports the
+figure build time, the JSON payload size sent to the browser and the
+serialization time (plotly.io.to_json, as st.plotly_chart does). A final
+row shows the cost of a FigureCache hit.
+
+Usage:
+    python benchmarks/bench_charts.py [--rows N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import plotly.express as px
+import plotly.io as pio
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import charts
+from analytics import DashboardAnalytics
+from data_loader import load_data
+from synthetic_data import write_sales
+
+
+def measure(build):
+    start = time.perf_counter()
+    fig = build()
+    built = time.perf_counter() - start
+    start = time.perf_counter()
+    payload = pio.to_json(fig, validate=False)
+    serialized = time.perf_counter() - start
+    return built, len(payload), serialized
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'sales.csv')
+        write_sales(path, args.rows)
+        df, error = load_data(path, use_cache=False)
+    if error:
+        sys.exit(error)
+    analytics = DashboardAnalytics(df)
+
+    monthly = analytics.trend({}, 'Monthly')
+    dated = df[['Registration', 'Price (AED)']].dropna().sort_values('Registration')
+    daily = dated.groupby('Registration', as_index=False)['Price (AED)'].mean()
+    cases = [
+        ('monthly trend', f'{len(monthly):,} periods',
+         lambda: px.line(monthly, x='MonthYear', y='Price (AED)'),
+         lambda: charts.line(monthly, x='MonthYear', y='Price (AED)')),
+        ('daily trend', f'{len(daily):,} days',
+         lambda: px.line(daily, x='Registration', y='Price (AED)'),
+         lambda: charts.line(daily, x='Registration', y='Price (AED)')),
+        ('transactions over time', f'{len(dated):,} sales',
+         lambda: px.scatter(dated, x='Registration', y='Price (AED)'),
+         lambda: charts.line(dated, x='Registration', y='Price (AED)')),
+        ('price distribution', f'{len(dated):,} sales',
+         lambda: px.histogram(dated, x='Price (AED)', nbins=charts.DEFAULT_BINS),
+         lambda: charts.histogram_chart(dated['Price (AED)'], label='Price (AED)')),
+    ]
+
+    # Warm up plotly.express so the first case does not pay its import-time setup
+    px.line(monthly, x='MonthYear', y='Price (AED)')
+
+    print(f"{args.rows:,} rows, point budget {charts.MAX_POINTS:,} per trace")
+    print(f"{'chart':<24}{'input':>16}{'variant':>10}{'build s':>10}{'payload KB':>13}{'to_json s':>11}")
+    for name, size, plain, budgeted in cases:
+        for variant, build in (('plotly', plain), ('budget', budgeted)):
+            built, payload, serialized = measure(build)
+            print(f"{name:<24}{size:>16}{variant:>10}{built:>10.3f}{payload / 1024:>13,.1f}{serialized:>11.3f}")
+
+    cache = charts.FigureCache()
+    build = lambda: charts.line(monthly, x='MonthYear', y='Price (AED)')
+    cache.get('monthly', build)
+    start = time.perf_counter()
+    for _ in range(1000):
+        cache.get('monthly', build)
+    print(f"figure cache hit: {(time.perf_counter() - start) * 1000:.1f} µs per lookup")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Benchmark the column-wise cleaners in data_loader against the original per-cell
+cleaners, and check that both produce identical values.
+
+Usage:
+    python benchmarks/bench_cleaning.py [rows ...]
+
+Defaults to 100k, 1M and 10M rows. The per-cell reference is only timed up to
+1M rows since it takes minutes beyond that.
+"""
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_loader import clean_currency_column, clean_area_column, clean_rate_column, clean_share_column
+
+REFERENCE_MAX_ROWS = 1_000_000
+
+
+# --- Original per-cell cleaners (reference implementation) ---
+
+def clean_currency(x):
+    if isinstance(x, str):
+        return pd.to_numeric(x.replace('AED', '').replace(',', '').strip(), errors='coerce')
+    return x
+
+def clean_area(x):
+    if isinstance(x, str):
+        if x.strip() == '-':
+            return np.nan
+        return pd.to_numeric(x.replace('sqm', '').replace(',', '').strip(), errors='coerce')
+    return x
+
+def clean_rate(x):
+    if isinstance(x, str):
+        if x.strip() == '-' or x.strip() == '':
+            return np.nan
+        return pd.to_numeric(x.replace('AED/sqm', '').replace(',', '').strip(), errors='coerce')
+    return x
+
+def clean_share(x):
+    if isinstance(x, str):
+        return pd.to_numeric(x.replace('%', '').strip(), errors='coerce') / 100.0
+    return 1.0
+
+
+# Edge cases every cleaner must agree on, mixed into the random data
+EDGE_CASES = {
+    'Price (AED)': ['AED 1,250,000', ' AED 950 ', '-', '', 'AED', 'abc', np.nan, 'AED 1,000.50'],
+    'Sold Area (sqm)': ['1,200.5 sqm', '-', ' - ', '', 'sqm', '85 sqm', np.nan, 'n/a'],
+    'Rate (AED/sqm)': ['10,373 AED/sqm', '-', '', '   ', 'AED/sqm', np.nan, '1,000.25 AED/sqm', 'x'],
+    'Share': ['50%', '100%', ' 33.3 % ', '-', '', np.nan, '%', '12'],
+}
+
+CLEANERS = {
+    'Price (AED)': (clean_currency, clean_currency_column),
+    'Sold Area (sqm)': (clean_area, clean_area_column),
+    'Rate (AED/sqm)': (clean_rate, clean_rate_column),
+    'Share': (clean_share, clean_share_column),
+}
+
+
+def make_raw_columns(n, seed=0):
+    rng = np.random.default_rng(seed)
+    area = rng.uniform(30, 2000, n)
+    price = area * rng.uniform(3000, 25000, n)
+    cols = {
+        'Price (AED)': pd.Series([f'AED {p:,.0f}' for p in price], dtype=object),
+        'Sold Area (sqm)': pd.Series([f'{a:,.2f} sqm' for a in area], dtype=object),
+        'Rate (AED/sqm)': pd.Series([f'{r:,.0f} AED/sqm' for r in price / area], dtype=object),
+        'Share': pd.Series(rng.choice(['100%', '50%', '25%', '-'], n), dtype=object),
+    }
+    for name, series in cols.items():
+        # Sprinkle placeholders and the edge cases through the column
+        blanks = rng.random(n) < 0.1
+        series[blanks] = '-'
+        edges = EDGE_CASES[name]
+        series.iloc[:len(edges)] = edges
+    return cols
+
+
+def check_parity(cols):
+    for name, (per_cell, column_wise) in CLEANERS.items():
+        expected = cols[name].apply(per_cell)
+        if name == 'Share':
+            expected = expected.fillna(1.0)
+        # Columns come back from read_csv as object or as the string dtype
+        # depending on the pandas version, both must clean the same way
+        for raw in (cols[name], cols[name].astype('string')):
+            actual = column_wise(raw)
+            pd.testing.assert_series_equal(actual, expected.astype('float64'), check_names=False)
+    print("Parity check passed: column-wise cleaners match the per-cell cleaners.")
+
+
+def bench(n):
+    cols = make_raw_columns(n)
+    results = []
+    for name, (per_cell, column_wise) in CLEANERS.items():
+        start = time.perf_counter()
+        column_wise(cols[name])
+        vec_s = time.perf_counter() - start
+
+        ref_s = None
+        if n <= REFERENCE_MAX_ROWS:
+            start = time.perf_counter()
+            cols[name].apply(per_cell)
+            ref_s = time.perf_counter() - start
+
+        results.append((name, vec_s, ref_s))
+
+    print(f"\n{n:,} rows")
+    print(f"{'column':<18}{'vectorized rows/s':>20}{'per-cell rows/s':>18}{'speedup':>10}")
+    for name, vec_s, ref_s in results:
+        ref_rate = f"{n / ref_s:,.0f}" if ref_s else "-"
+        speedup = f"{ref_s / vec_s:.1f}x" if ref_s else "-"
+        print(f"{name:<18}{n / vec_s:>20,.0f}{ref_rate:>18}{speedup:>10}")
+
+
+if __name__ == "__main__":
+    sizes = [int(float(a)) for a in sys.argv[1:]] or [100_000, 1_000_000, 10_000_000]
+    check_parity(make_raw_columns(10_000, seed=1))
+    for n in sizes:
+        bench(n)
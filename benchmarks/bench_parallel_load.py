@@ -0,0 +1,48 @@
+"""
+Benchmark parallel loading of sharded sales files with data_loader.load_data.
+
+Writes a synthetic dataset split into shards to a temporary directory, then
+loads it uncached with 1, 2, 4, ... worker processes up to the CPU count and
+reports the speedup over a single worker.
+
+Usage:
+    python benchmarks/bench_parallel_load.py [--rows N] [--shards N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_loader import load_data
+from synthetic_data import write_sales
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=2_000_000)
+    parser.add_argument('--shards', type=int, default=16)
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    worker_counts = sorted({1, cpus} | {w for w in (2, 4, 8, 16, 32, 64) if w < cpus})
+
+    with tempfile.TemporaryDirectory() as directory:
+        write_sales(directory, args.rows, shards=args.shards)
+        print(f"{args.rows:,} rows in {args.shards} shards, {cpus} CPUs")
+        print(f"{'workers':>8}{'seconds':>10}{'rows/s':>14}{'speedup':>10}{'efficiency':>12}")
+        baseline = None
+        for workers in worker_counts:
+            start = time.perf_counter()
+            df, error = load_data(directory, use_cache=False, workers=workers)
+            elapsed = time.perf_counter() - start
+            if error:
+                raise SystemExit(error)
+            baseline = baseline or elapsed
+            speedup = baseline / elapsed
+            print(f"{workers:>8}{elapsed:>10.2f}{len(df) / elapsed:>14,.0f}{speedup:>9.2f}x{speedup / workers:>11.0%}")
+
+
+if __name__ == "__main__":
+    main()
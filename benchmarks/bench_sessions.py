@@ -0,0 +1,118 @@
+"""
+Benchmark per-session memory with concurrent dashboard sessions.
+
+Loads a synthetic dataset through the columnar cache (memory-mapped, as the
+app does), then keeps N simulated sessions alive at once. Each one applies
+a random geography filter and derives a column for it, either the old way
+(an unpickled copy of the whole frame per rerun, as st.cache_data returned,
+plus a filtered copy) or the shared way (row positions from the shared
+filter index, and only the selected rows of the columns used). Reports the
+memory held per session, which should stay flat for the shared pattern as
+sessions are added.
+
+Usage:
+    python benchmarks/bench_sessions.py [--rows N] [--sessions 1 10 50]
+"""
+import argparse
+import gc
+import os
+import pickle
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from data_loader import ingest
+from filter_index import FilterIndex, GEO_DIMENSIONS
+from shared_data import frame_nbytes
+from synthetic_data import write_sales
+
+# Copying sessions hold a full frame each, so they are only run up to this many
+MAX_COPY_SESSIONS = 20
+
+
+def random_selection(index, rng):
+    selection = {}
+    for dim in GEO_DIMENSIONS[:2]:
+        options = index.options(dim, selection)
+        if options:
+            selection[dim] = options[rng.integers(len(options))]
+    return selection
+
+
+def copy_session(df, index, selection):
+    # Before: every rerun received its own unpickled copy and filtered a copy of that
+    data = pickle.loads(pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL))
+    mask = np.ones(len(data), dtype=bool)
+    for dim, value in selection.items():
+        mask &= (data[dim] == value).to_numpy()
+    filtered = data[mask].copy()
+    filtered['Price per Area'] = filtered['Price (AED)'] / filtered['Effective Area']
+    return data, filtered
+
+
+def shared_session(df, index, selection):
+    # Now: positions into the shared frame, gathering only the columns used
+    rows = index.rows(selection)
+    price, area = (df[c] if rows is None else df[c].take(rows) for c in ('Price (AED)', 'Effective Area'))
+    return rows, price / area
+
+
+def rss_bytes():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--sessions', type=int, nargs='+', default=[1, 10, 50])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'sales.csv')
+        write_sales(path, args.rows)
+        ingest(path)
+        gc.collect()
+        before = rss_bytes()
+        df, error = ingest(path)
+        after = rss_bytes()
+        if error:
+            sys.exit(error)
+        index = FilterIndex(df)
+
+        print(f"{args.rows:,} rows, {frame_nbytes(df) / 1e6:,.1f} MB in pandas", end='')
+        if before is not None:
+            print(f", {(after - before) / 1e6:,.1f} MB resident after the cached load (the rest stays memory-mapped)")
+        else:
+            print()
+        print(f"{'pattern':<10}{'sessions':>10}{'MB/session':>12}{'ms/session':>12}")
+
+        for name, session in (('copy', copy_session), ('shared', shared_session)):
+            for n in args.sessions:
+                if name == 'copy' and n > MAX_COPY_SESSIONS:
+                    continue
+                rng = np.random.default_rng(n)
+                selections = [random_selection(index, rng) for _ in range(n)]
+                gc.collect()
+                tracemalloc.start()
+                start = time.perf_counter()
+                alive = [session(df, index, selection) for selection in selections]
+                elapsed = time.perf_counter() - start
+                held = tracemalloc.get_traced_memory()[0]
+                tracemalloc.stop()
+                print(f"{name:<10}{n:>10}{held / n / 1e6:>12,.2f}{elapsed / n * 1000:>12,.1f}")
+                del alive
+
+        del df
+        gc.collect()
+
+
+if __name__ == "__main__":
+    main()
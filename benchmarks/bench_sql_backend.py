@@ -0,0 +1,131 @@
+"""
+Check that the DuckDB backend (sql_backend.py) gives the same results as the
+pandas analytics, and compare their speed.
+
+Builds both backends on synthetic sales data, then runs every dashboard
+view (filter options, metrics, trends, top areas, growth indicators, flip
+statistics, repeat-sales index) for a sample of filter selections. Any
+mismatch fails the run.
+
+Usage:
+    python benchmarks/bench_sql_backend.py [--rows N] [--selections N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from analytics import DashboardAnalytics, INTERVALS
+from data_loader import load_data
+from filter_index import DETAIL_DIMENSIONS, GEO_DIMENSIONS
+from flips import HOLDING_WINDOWS
+from sql_backend import DuckDBAnalytics
+from synthetic_data import write_sales
+
+
+def sample_selections(analytics, n, seed=0):
+    rng = np.random.default_rng(seed)
+    selections = [{}]
+    while len(selections) < n:
+        selection = {}
+        for dim in GEO_DIMENSIONS + DETAIL_DIMENSIONS:
+            options = analytics.options(dim, selection)
+            if options and rng.random() < 0.4:
+                selection[dim] = options[rng.integers(len(options))]
+        selections.append(selection)
+    return selections
+
+
+def normalize(frame):
+    frame = frame.reset_index(drop=True)
+    for col in frame.columns:
+        if not pd.api.types.is_numeric_dtype(frame[col]) or isinstance(frame[col].dtype, pd.CategoricalDtype):
+            frame[col] = frame[col].astype(str)
+        else:
+            frame[col] = frame[col].astype('float64')
+    return frame
+
+
+def views(analytics, selection):
+    geo = {d: v for d, v in selection.items() if d in GEO_DIMENSIONS}
+    yield 'options', lambda: [analytics.options(dim, selection) for dim in GEO_DIMENSIONS + DETAIL_DIMENSIONS]
+    yield 'metrics', lambda: analytics.metrics(selection)
+    for interval in INTERVALS:
+        yield f'trend {interval.lower()}', lambda: analytics.trend(selection, interval)
+    for by in ['District', 'Community', 'Project']:
+        yield f'top {by.lower()}', lambda: analytics.top_areas(selection, by)
+    yield 'growth indicators', lambda: analytics.growth_indicators(geo)
+    if analytics.has_flips:
+        for window in HOLDING_WINDOWS:
+            yield f'flip stats {window}d', lambda: analytics.flip_stats(geo, window)
+        # Runs in pandas on both backends
+        yield 'repeat-sales index', lambda: analytics.repeat_sales_index(geo)
+
+
+def same(a, b):
+    if isinstance(a, pd.DataFrame):
+        pd.testing.assert_frame_equal(normalize(a), normalize(b), check_dtype=False, rtol=1e-6)
+    elif isinstance(a, dict):
+        assert a.keys() == b.keys()
+        for key in a:
+            same(a[key], b[key])
+    elif isinstance(a, (list, tuple)):
+        assert len(a) == len(b)
+        for x, y in zip(a, b):
+            same(x, y)
+    elif isinstance(a, float):
+        assert (np.isnan(a) and np.isnan(b)) or np.isclose(a, b, rtol=1e-6), (a, b)
+    else:
+        assert a == b, (a, b)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, default=500_000)
+    parser.add_argument('--selections', type=int, default=25)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'sales.csv')
+        write_sales(path, args.rows)
+        df, error = load_data(path, use_cache=False)
+        if error:
+            sys.exit(error)
+
+        start = time.perf_counter()
+        pandas_backend = DashboardAnalytics(df)
+        pandas_build = time.perf_counter() - start
+        start = time.perf_counter()
+        sql_backend = DuckDBAnalytics(df, directory)
+        sql_build = time.perf_counter() - start
+
+        selections = sample_selections(pandas_backend, args.selections)
+        timings = defaultdict(lambda: [0.0, 0.0])
+        for selection in selections:
+            for (name, run_pandas), (_, run_sql) in zip(views(pandas_backend, selection), views(sql_backend, selection)):
+                start = time.perf_counter()
+                expected = run_pandas()
+                timings[name][0] += time.perf_counter() - start
+                start = time.perf_counter()
+                actual = run_sql()
+                timings[name][1] += time.perf_counter() - start
+                try:
+                    same(expected, actual)
+                except AssertionError as e:
+                    sys.exit(f"Mismatch in {name} for {selection}: {e}")
+
+    print(f"{args.rows:,} rows, {len(selections)} selections: DuckDB results match pandas")
+    print(f"{'view':<22}{'pandas ms':>12}{'duckdb ms':>12}")
+    print(f"{'build':<22}{pandas_build * 1000:>12,.1f}{sql_build * 1000:>12,.1f}")
+    for name, (pandas_s, sql_s) in timings.items():
+        print(f"{name:<22}{pandas_s / len(selections) * 1000:>12,.1f}{sql_s / len(selections) * 1000:>12,.1f}")
+
+
+if __name__ == "__main__":
+    main()
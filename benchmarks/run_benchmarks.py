@@ -0,0 +1,201 @@
+"""
+Headless benchmark suite for the dashboard's compute paths.
+
+Generates a synthetic sales file (or uses --data), then times each stage
+separately: CSV parsing, cleaning, cache build/read, filter index,
+trend aggregation (cube roll-ups against a direct groupby, with the cube's
+cells per transaction), growth indicators, flip detection and the repeat-sales
+index. Results are written as JSON so runs can be compared over time;
+a readable summary goes to stderr.
+
+Usage:
+    python benchmarks/run_benchmarks.py --rows 1000000 --out bench.json
+    python benchmarks/run_benchmarks.py --data recent_sales.txt
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from data_loader import clean_frame, ingest, read_sales_csv
+from filter_index import FilterIndex
+from cube import AggregateCube, MEASURES
+from indicators import growth_indicators_for, popular_selections
+from flips import FlipEngine
+from repeat_sales import RepeatSalesIndex
+from synthetic_data import write_sales
+
+
+class Recorder:
+    def __init__(self, rows):
+        self.rows = rows
+        self.results = []
+
+    @contextmanager
+    def stage(self, name, rows=None, **extra):
+        start = time.perf_counter()
+        yield extra
+        seconds = time.perf_counter() - start
+        rows = self.rows if rows is None else rows
+        result = {'stage': name, 'seconds': round(seconds, 6), 'rows': rows,
+                  'rows_per_s': round(rows / seconds) if seconds > 0 and rows else None}
+        result.update(extra)
+        self.results.append(result)
+        print(f"{name:<28}{seconds:>10.3f}s", file=sys.stderr)
+
+
+def sample_selections(index, n=20, seed=0):
+    """
+    Random sidebar/detail selections that exist in the data, from coarse to fine.
+    """
+    rng = np.random.default_rng(seed)
+    selections = []
+    for _ in range(n):
+        selection = {}
+        for dim in index.dimensions:
+            options = index.options(dim, selection)
+            if options and rng.random() < 0.5:
+                selection[dim] = options[rng.integers(len(options))]
+        selections.append(selection)
+    return selections
+
+
+def mask_filter(df, selection):
+    # Baseline: the chained boolean masks the dashboard used before the index
+    out = df
+    for dim, value in selection.items():
+        out = out[out[dim] == value]
+    return out
+
+
+def groupby_rollup(df, selection, by):
+    # Baseline for the cube: filter the transactions and group them directly
+    return mask_filter(df, selection).groupby(by, observed=True)[MEASURES].mean()
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def run(data_path, work_dir):
+    with open(data_path, 'rb') as f:
+        rows = sum(1 for _ in f) - 1
+    rec = Recorder(rows)
+
+    with rec.stage('parse_csv'):
+        raw = read_sales_csv(data_path)
+    with rec.stage('clean'):
+        df = clean_frame(raw)
+    del raw
+
+    cached_path = os.path.join(work_dir, 'cache_source.csv')
+    shutil.copy(data_path, cached_path)
+    with rec.stage('cache_build'):
+        ingest(cached_path)
+    with rec.stage('cache_read'):
+        ingest(cached_path)
+
+    with rec.stage('filter_index_build'):
+        index = FilterIndex(df)
+    selections = sample_selections(index)
+    with rec.stage('filter_query_index', queries=len(selections)):
+        for selection in selections:
+            index.select(df, selection)
+    with rec.stage('filter_query_masks', queries=len(selections)):
+        for selection in selections:
+            mask_filter(df, selection)
+
+    with rec.stage('trend_cube_build') as extra:
+        cube = AggregateCube(df, index)
+        extra['grains'] = [
+            {'dimensions': dims, 'cells': len(cells), 'cells_per_row': round(len(cells) / max(len(df), 1), 4)}
+            for dims, cells, _ in cube.grains
+        ]
+    # The unfiltered view and single districts, as the dashboard opens, plus the random selections
+    trend_selections = [{}] + [{'District': d} for d in index.options('District', {})[:5]] + selections
+    trend_by = ('Year', 'Quarter', 'Month', 'District', 'Community', 'Project')
+    queries = len(trend_selections) * len(trend_by)
+    with rec.stage('trend_rollups', queries=queries):
+        for selection in trend_selections:
+            for by in trend_by:
+                cube.rollup(by, selection)
+    with_months = df.assign(Month=cube.months)
+    with rec.stage('trend_groupby', queries=queries):
+        for selection in trend_selections:
+            for by in trend_by:
+                groupby_rollup(with_months, selection, by)
+    del with_months
+
+    geo = [dict(zip(['District', 'Community', 'Project', 'Year'], key)) for key in popular_selections(cube)]
+    with rec.stage('growth_indicators', queries=len(geo)):
+        for selection in geo:
+            growth_indicators_for(cube, selection)
+
+    with rec.stage('flip_engine_build'):
+        flips = FlipEngine(df)
+    with rec.stage('flip_stats', queries=len(geo)):
+        for selection in geo:
+            flips.stats(index.rows(selection))
+
+    with rec.stage('repeat_sales_index') as extra:
+        rsi = RepeatSalesIndex(df, flips)
+        extra['quarters'] = len(rsi.index())
+
+    return rec.results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard's compute paths.")
+    parser.add_argument('--rows', type=int, default=1_000_000, help="synthetic rows to generate")
+    parser.add_argument('--data', help="existing sales file to benchmark instead of synthetic data")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--out', help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        data_path = args.data
+        if data_path is None:
+            data_path = os.path.join(work_dir, 'synthetic_sales.txt')
+            start = time.perf_counter()
+            write_sales(data_path, args.rows, args.seed)
+            print(f"generated {args.rows:,} rows in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        results = run(data_path, work_dir)
+
+    report = {
+        'meta': {
+            'timestamp': pd.Timestamp.now(tz='UTC').isoformat(),
+            'commit': git_commit(),
+            'data': args.data or f'synthetic:{args.rows}:seed{args.seed}',
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'cpus': os.cpu_count(),
+            'platform': platform.platform(),
+        },
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Chart data layer between the analytics frames and Plotly. Every chart goes
+through a point budget before it is handed to plotly.express: line charts
+are downsampled with Largest-Triangle-Three-Buckets (LTTB), bar and pie
+charts keep their leading categories, and distributions are binned on the
+server so only bin counts are serialized. Built figures are kept in a
+FigureCache keyed by the filter state, so revisiting a view skips both the
+query and the figure construction.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+from profiling import stage
+
+# Most points per trace sent to the browser
+MAX_POINTS = 1000
+DEFAULT_BINS = 50
+# Figures kept across sessions (least recently used evicted)
+MAX_CACHED_FIGURES = 512
+
+
+def lttb(x, y, n_out):
+    """
+    Positions of the n_out points that best keep the visual shape of the
+    series (x, y), by Largest-Triangle-Three-Buckets: the first and last
+    points are kept, the rest are split into n_out - 2 buckets, and from each
+    bucket the point forming the largest triangle with the previously kept
+    point and the mean of the next bucket is taken. Missing y values are
+    only kept when a bucket has nothing else.
+    """
+    n = len(y)
+    if n_out >= n or n < 3:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1])[:max(n_out, 1)]
+
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Mean of the next bucket; the last bucket looks at the final point
+        nlo, nhi = (edges[i + 1], edges[i + 2]) if i + 2 < len(edges) else (n - 1, n)
+        next_y = y[nlo:nhi]
+        cy = np.nanmean(next_y) if np.isfinite(next_y).any() else y[a]
+        cx = x[nlo:nhi].mean()
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        area = np.where(np.isnan(area), -1.0, area)
+        a = lo + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def _position(values):
+    # Numeric or datetime x is used as is; labels such as '2024Q1' are evenly spaced
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype='float64', na_value=np.nan)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.to_numpy().astype('datetime64[ns]').astype('int64').astype('float64')
+    return np.arange(len(values), dtype='float64')
+
+
+def downsample(frame, x, y, max_points=MAX_POINTS):
+    """
+    Rows of frame (sorted by x) to draw line(s) of the y column(s) within
+    max_points per trace. With several y columns, the points kept for any
+    of them are kept.
+    """
+    if len(frame) <= max_points:
+        return frame
+    frame = frame.sort_values(x)
+    pos = _position(frame[x])
+    keep = np.unique(np.concatenate([lttb(pos, frame[col].to_numpy(dtype='float64', na_value=np.nan), max_points)
+                                     for col in ([y] if isinstance(y, str) else y)]))
+    return frame.iloc[keep]
+
+
+def histogram(values, bins=DEFAULT_BINS, value_range=None):
+    """
+    Counts of values in equal-width bins, as a frame with 'bin_start',
+    'bin_end', 'bin_mid' and 'count'. Missing values are left out.
+    """
+    values = pd.Series(values).to_numpy(dtype='float64', na_value=np.nan)
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return pd.DataFrame(columns=['bin_start', 'bin_end', 'bin_mid', 'count'])
+    counts, edges = np.histogram(values, bins=bins, range=value_range)
+    return pd.DataFrame({
+        'bin_start': edges[:-1], 'bin_end': edges[1:],
+        'bin_mid': (edges[:-1] + edges[1:]) / 2, 'count': counts,
+    })
+
+
+def _with_layout(fig, layout):
+    if layout:
+        fig.update_layout(**layout)
+    return fig
+
+
+def line(frame, x, y, max_points=MAX_POINTS, layout=None, **kwargs):
+    """
+    px.line of frame, downsampled to max_points per trace. layout is passed
+    to update_layout; other keywords go to px.line.
+    """
+    with stage('line chart'):
+        return _with_layout(px.line(downsample(frame, x, y, max_points), x=x, y=y, **kwargs), layout)
+
+
+def bar(frame, x, y, max_points=MAX_POINTS, layout=None, **kwargs):
+    # Frames arrive ranked, so the budget keeps the leading categories
+    with stage('bar chart'):
+        return _with_layout(px.bar(frame.head(max_points), x=x, y=y, **kwargs), layout)
+
+
+def pie(frame, values, names, max_points=MAX_POINTS, layout=None, **kwargs):
+    with stage('pie chart'):
+        return _with_layout(px.pie(frame.head(max_points), values=values, names=names, **kwargs), layout)
+
+
+def histogram_chart(values, bins=DEFAULT_BINS, value_range=None, label='value', **kwargs):
+    """
+    Bar chart of pre-binned values: only `bins` bars are serialized,
+    however many values there are.
+    """
+    with stage('histogram chart'):
+        binned = histogram(values, bins, value_range)
+        fig = px.bar(binned, x='bin_mid', y='count', hover_data=['bin_start', 'bin_end'],
+                     labels={'bin_mid': label}, **kwargs)
+        return _with_layout(fig, {'bargap': 0})
+
+
+class FigureCache:
+    """
+    Built figures keyed by chart name and filter state, shared by all
+    sessions. Plotly figures are not changed by st.plotly_chart, so one
+    instance can be drawn by any number of sessions.
+    """
+
+    def __init__(self, max_entries=MAX_CACHED_FIGURES):
+        self.max_entries = max_entries
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """
+        The figure cached under key, or build() stored under it.
+        """
+        with self._lock:
+            if key in self._figures:
+                self._figures.move_to_end(key)
+                return self._figures[key]
+        fig = build()
+        with self._lock:
+            self._figures[key] = fig
+            while len(self._figures) > self.max_entries:
+                self._figures.popitem(last=False)
+        return fig
+
+
+def filter_key(spec):
+    """
+    Hashable form of a filter spec, ignoring "All" values.
+    """
+    return tuple(sorted((dim, value) for dim, value in spec.items() if value != "All"))
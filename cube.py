@@ -0,0 +1,133 @@
+import numpy as np
+import pandas as pd
+
+from filter_index import FilterIndex
+
+# Cube grains, coarse to fine. A query is answered from the first grain that
+# has every dimension it filters or groups on. Year and Quarter are implied by
+# Month (and Year by Quarter), so they do not add cells, they only make
+# roll-ups to them cheap. Queries on Project, or on Community by month, group
+# the filtered transactions directly: those filters leave few rows, while a
+# cube fine enough for them would have nearly one cell per transaction.
+CUBE_GRAINS = [
+    ['District', 'Asset Type', 'Property Type', 'Sale Type', 'Sequence', 'Year', 'Quarter', 'Month'],
+    ['District', 'Community', 'Asset Type', 'Property Type', 'Sale Type', 'Sequence', 'Year', 'Quarter'],
+]
+# A grain with more cells than this share of the transactions is no faster
+# than grouping the transactions, so it is not kept
+MAX_CELL_RATIO = 0.25
+MEASURES = ['Price (AED)', 'Rate (AED/sqm)']
+
+
+class AggregateCube:
+    """
+    Sum and count of Price and Rate per combination of each grain's
+    dimensions (see CUBE_GRAINS), built once per dataset. Charts roll the
+    coarsest grain that covers their filters up to the dimension they plot and
+    derive means as sum / count, so a wide view costs time proportional to the
+    number of cube cells rather than the number of transactions. Narrow views
+    are grouped from the transactions selected through the filter index.
+    """
+
+    def __init__(self, df, index=None):
+        self.df = df
+        self.index = index if index is not None else FilterIndex(df)
+        measures = df[MEASURES].astype('float64')
+        # Month of every transaction as a categorical (one byte per row), for
+        # the grains and for monthly roll-ups of the transactions
+        self.months = df['Registration'].dt.to_period('M').astype(str).astype('category')
+
+        # (dimensions, cells, index over the cells), coarse to fine
+        self.grains = []
+        for grain in CUBE_GRAINS:
+            dims = [c for c in grain if c in df.columns or c == 'Month']
+            frame = pd.DataFrame({c: self.months if c == 'Month' else df[c] for c in dims})
+            aggs = {'transactions': ('Price (AED)', 'size')}
+            for measure in MEASURES:
+                # Sum in float64 so float32 columns do not lose precision across many rows
+                frame[measure] = measures[measure]
+                aggs[measure + ' sum'] = (measure, 'sum')
+                aggs[measure + ' count'] = (measure, 'count')
+
+            # dropna=False keeps rows with a missing dimension, they still count in
+            # roll-ups to the other dimensions
+            cells = frame.groupby(dims, observed=True, dropna=False).agg(**aggs).reset_index()
+            if len(cells) <= MAX_CELL_RATIO * len(df):
+                self.grains.append((dims, cells, FilterIndex(cells, dimensions=dims)))
+
+    def _cells(self, selection, by=()):
+        """
+        Cells of the coarsest grain covering selection and by, or None when
+        only the transactions have every dimension needed.
+        """
+        needed = {dim for dim, value in selection.items() if value != "All"} | set(by)
+        for dims, cells, index in self.grains:
+            if needed <= set(dims):
+                return index.select(cells, selection)
+        return None
+
+    def _transactions(self, selection, by=()):
+        rows = self.index.rows(selection)
+        columns = [c for c in by if c != 'Month'] + ['Year'] + MEASURES
+        frame = self.df[[c for c in dict.fromkeys(columns) if c in self.df.columns]]
+        if rows is not None:
+            frame = frame.take(rows)
+        frame = frame.astype({m: 'float64' for m in MEASURES})
+        if 'Month' in by:
+            frame['Month'] = (self.months if rows is None else self.months.take(rows)).array
+        return frame
+
+    def rollup(self, by, selection):
+        """
+        Transactions and mean Price/Rate per value of `by` for the rows
+        matching selection, as a frame with `by`, 'transactions' and one column
+        per measure. Rows with a missing `by` value are dropped, as in groupby.
+        """
+        dims = [by] if isinstance(by, str) else list(by)
+        cells = self._cells(selection, dims)
+        if cells is None:
+            grouped = self._transactions(selection, dims).groupby(by, observed=True)
+            out = pd.DataFrame({'transactions': grouped.size()})
+            for measure in MEASURES:
+                out[measure] = grouped[measure].mean()
+            return out.reset_index()
+
+        sums = [m + ' sum' for m in MEASURES] + [m + ' count' for m in MEASURES]
+        grouped = cells.groupby(by, observed=True)[['transactions'] + sums].sum()
+        out = pd.DataFrame({'transactions': grouped['transactions']})
+        for measure in MEASURES:
+            out[measure] = grouped[measure + ' sum'] / grouped[measure + ' count'].replace(0, np.nan)
+        return out.reset_index()
+
+    def top(self, by, measure, selection, n=10):
+        """
+        The n values of `by` with the highest mean measure.
+        """
+        ranked = self.rollup(by, selection)
+        return ranked.sort_values(measure, ascending=False).head(n)[[by, measure]]
+
+    def totals(self, selection):
+        """
+        Transaction count, mean Price/Rate and number of dated transactions
+        for the rows matching selection.
+        """
+        cells = self._cells(selection, ['Year'])
+        if cells is None:
+            frame = self._transactions(selection)
+            totals = {
+                'transactions': len(frame),
+                'dated': int(frame['Year'].notna().sum()) if 'Year' in frame.columns else 0,
+            }
+            for measure in MEASURES:
+                count = frame[measure].count()
+                totals[measure] = frame[measure].sum() / count if count else np.nan
+            return totals
+
+        totals = {
+            'transactions': int(cells['transactions'].sum()),
+            'dated': int(cells.loc[cells['Year'].notna(), 'transactions'].sum()) if 'Year' in cells.columns else 0,
+        }
+        for measure in MEASURES:
+            count = cells[measure + ' count'].sum()
+            totals[measure] = cells[measure + ' sum'].sum() / count if count else np.nan
+        return totals
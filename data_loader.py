@@ -1,76 +1,843 @@
+import glob
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
 import pandas as pd
 import numpy as np
 
-def load_data(file_path):
+try:
+    import pyarrow
+    import pyarrow.feather as feather
+    import pyarrow.compute
+    import pyarrow.ipc
+    _ARROW_STRING = 'string[pyarrow]'
+except ImportError:
+    feather = None
+    _ARROW_STRING = None
+
+# Bump when the cleaning logic or cache layout changes so existing caches are rebuilt
+CACHE_VERSION = 6
+CACHE_DIR_NAME = '.cache'
+# Incremental ingests add cache parts; past this many they are merged back (see _compact)
+MAX_CACHE_PARTS = 32
+# Bytes at the end of the ingested source used to recognise an append-only change
+TAIL_BYTES = 64 * 1024
+# Category seeded into a streamed part's empty dictionaries (see _write_streamed_part)
+DICTIONARY_PLACEHOLDER = ''
+# Default working-memory budget for parsing and cleaning a source (see clean_chunks)
+LOAD_MEMORY_MB = 256
+
+# --- Compact schema ---
+# Dimension columns have few distinct values and are stored as categoricals.
+# Areas, rates and shares fit in float32; Price stays float64 because AED
+# amounts above ~16.7M are not exactly representable in float32.
+CATEGORY_COLS = [
+    'District', 'Community', 'Project', 'Asset Type', 'Property Type',
+    'Sale Type', 'Sequence', 'Layout', 'Share', 'Quarter',
+]
+FLOAT32_COLS = ['Sold Area (sqm)', 'Plot Area (sqm)', 'Rate (AED/sqm)', 'Effective Area', 'Share_Value']
+
+# Columns that identify a transaction when deduplicating incremental batches
+TRANSACTION_KEY_COLS = [
+    'Registration', 'Price (AED)', 'District', 'Community', 'Project', 'Layout',
+    'Sold Area (sqm)', 'Plot Area (sqm)', 'Asset Type', 'Property Type',
+    'Sale Type', 'Sequence', 'Share',
+]
+
+
+# --- Column-wise cleaning ---
+# These work on a whole column at once with vectorized .str operations instead
+# of calling a Python function per cell. Semantics match the original per-cell
+# cleaners: string cells have their unit tokens and thousands separators
+# removed and are parsed with pd.to_numeric (so '-', '' and junk become NaN),
+# while non-string cells (already-parsed numbers, NaN) pass through unchanged.
+
+def _as_text(series):
+    """
+    Return a string column ready for .str operations, or None if the column
+    was already parsed as numbers. Pure-string object columns are moved onto
+    Arrow strings when pyarrow is installed, which makes .str several times faster.
+    """
+    if not (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+        return None
+    if (_ARROW_STRING is not None and pd.api.types.is_object_dtype(series)
+            and pd.api.types.infer_dtype(series, skipna=True) == 'string'):
+        return series.astype(_ARROW_STRING)
+    return series
+
+
+def _strip_units(series, *tokens):
+    """
+    Remove unit tokens and commas from a string column and parse it as numbers.
+    """
+    text = _as_text(series)
+    if text is None:
+        # pandas already parsed the column as numeric
+        return series
+
+    for token in tokens + (',',):
+        text = text.str.replace(token, '', regex=False)
+    text = text.str.strip()
+
+    cleaned = pd.to_numeric(text, errors='coerce').astype('float64')
+    # .str yields NaN for non-string cells, keep their original value
+    non_str = text.isna() & series.notna()
+    if non_str.any():
+        cleaned[non_str] = pd.to_numeric(series[non_str], errors='coerce')
+    return cleaned
+
+
+def clean_currency_column(series):
+    """'AED 1,250,000' -> 1250000.0"""
+    return _strip_units(series, 'AED')
+
+
+def clean_area_column(series):
+    """'1,200.5 sqm' -> 1200.5, '-' -> NaN"""
+    return _strip_units(series, 'sqm')
+
+
+def clean_rate_column(series):
+    """'10,373 AED/sqm' -> 10373.0, '-' or '' -> NaN"""
+    return _strip_units(series, 'AED/sqm')
+
+
+def clean_share_column(series):
+    """
+    '50%' -> 0.5. Missing, non-string and unparseable shares default to 1.0 (100%).
+    """
+    text = _as_text(series)
+    if text is None:
+        return pd.Series(1.0, index=series.index)
+    share = pd.to_numeric(text.str.replace('%', '', regex=False).str.strip(), errors='coerce') / 100.0
+    return share.astype('float64').fillna(1.0)
+
+
+def clean_frame(df, report=False):
+    """
+    Clean a raw transactions frame as read from the sales CSV, add the derived
+    'Effective Area', 'Share_Value', 'Year' and 'Quarter' columns and imputed
+    Rate, and return it in the compact schema. With report=True the per-column
+    memory before and after compaction is printed.
+    """
+    # Clean Price
+    df['Price (AED)'] = clean_currency_column(df['Price (AED)'])
+    
+    # Clean Areas
+    df['Sold Area (sqm)'] = clean_area_column(df['Sold Area (sqm)'])
+    df['Plot Area (sqm)'] = clean_area_column(df['Plot Area (sqm)'])
+    
+    # Clean Rate
+    df['Rate (AED/sqm)'] = clean_rate_column(df['Rate (AED/sqm)'])
+    
+    # Clean Registration Date
+    df['Registration'] = pd.to_datetime(df['Registration'], dayfirst=True, errors='coerce')
+    
+    # Calculate derived Rate if missing
+    # Prefer Sold Area, then Plot Area
+    df['Effective Area'] = df['Sold Area (sqm)'].fillna(df['Plot Area (sqm)'])
+    
+    # Calculate Rate where missing
+    # Note: We are assuming Price is for the given Share.
+    # To get a comparable Market Rate (Valuation Rate), strictly we should assume 
+    # Rate = (Price / Share_Percentage) / Area  OR Price / (Area * Share_Percentage)
+    # However, 'Share' column is string like '50%'.
+    df['Share_Value'] = clean_share_column(df['Share'])
+    
+    # Calculated Rate = Price / (Effective Area * Share_Value)
+    # Avoid division by zero
+    mask = (df['Rate (AED/sqm)'].isna()) & (df['Effective Area'] > 0) & (df['Price (AED)'] > 0)
+    df.loc[mask, 'Rate (AED/sqm)'] = df.loc[mask, 'Price (AED)'] / (df.loc[mask, 'Effective Area'] * df.loc[mask, 'Share_Value'])
+    
+    # Drop rows where we still don't have a valid Rate or Price or Registration date?
+    # For the dashboard, we might want to keep them but filter in charts.
+    # Let's keep them and handle in charts.
+
+    # Period columns used by the filters and the growth indicators
+    df['Year'] = df['Registration'].dt.year
+    df['Quarter'] = df['Registration'].dt.to_period('Q').astype(str)
+
+    compact = compact_frame(df)
+    if report:
+        print(memory_report(df, compact).to_string())
+    return compact
+
+
+def compact_frame(df):
+    """
+    Convert a cleaned frame to the compact schema: categoricals for the
+    dimension columns, float32 for areas/rates/shares, Int16 for Year and a
+    second-resolution Registration.
+    """
+    df = df.copy(deep=False)
+    for col in CATEGORY_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in FLOAT32_COLS:
+        if col in df.columns:
+            df[col] = df[col].astype('float32')
+    if 'Year' in df.columns:
+        df['Year'] = df['Year'].astype('Int16')
+    if 'Registration' in df.columns:
+        df['Registration'] = df['Registration'].astype('datetime64[s]')
+    return df
+
+
+def memory_report(before, after):
+    """
+    Per-column memory in MB of a frame before and after compact_frame, with a
+    'Total' row.
+    """
+    report = pd.DataFrame({
+        'before_mb': before.memory_usage(deep=True, index=False),
+        'after_mb': after.memory_usage(deep=True, index=False),
+    }) / 1e6
+    report.loc['Total'] = report.sum()
+    report['ratio'] = report['before_mb'] / report['after_mb']
+    return report.round(2)
+
+
+def read_sales_csv(source, nrows=None):
+    """
+    Read a raw sales CSV (path or file-like) with the export's quoting rules,
+    optionally only its first nrows rows.
+    """
+    df = pd.read_csv(source, quotechar='"', skipinitialspace=True, nrows=nrows)
+    # Clean column names (strip whitespace)
+    df.columns = df.columns.str.strip()
+    return df
+
+
+def transaction_keys(df):
+    """
+    Stable 64-bit key per transaction, computed from the cleaned columns so
+    formatting differences between exports do not create false duplicates.
+    """
+    cols = [c for c in TRANSACTION_KEY_COLS if c in df.columns]
+    return pd.util.hash_pandas_object(df[cols], index=False).to_numpy()
+
+
+# --- Streaming load ---
+# Reading the whole CSV before cleaning keeps every raw string column alive
+# next to its cleaned copy. Large files are instead parsed and cleaned a chunk
+# at a time, and each compact chunk goes straight to the cache (see
+# _write_streamed_part) or into the in-memory result, so the raw data held
+# at once is bounded by the memory budget rather than the file size.
+
+# Raw rows parsed up front to estimate the memory taken per row
+SAMPLE_ROWS = 10_000
+# Parsing and cleaning a chunk peaks at about this multiple of its raw size
+CLEANING_OVERHEAD = 3
+
+
+def chunk_rows(sample, memory_mb):
+    """
+    Rows per chunk so that parsing and cleaning one chunk stays within
+    memory_mb, given a sample of raw rows.
+    """
+    row_bytes = sample.memory_usage(deep=True, index=False).sum() / max(len(sample), 1)
+    return max(1000, int(memory_mb * 1e6 / (CLEANING_OVERHEAD * max(row_bytes, 1))))
+
+
+def clean_chunks(file_path, memory_mb=LOAD_MEMORY_MB, progress=None):
+    """
+    Yield the cleaned, compact frame of a sales file in chunks sized to a
+    working-memory budget of memory_mb. A file within the sample size is
+    cleaned in one piece. progress(fraction, text), if given, is called after
+    each chunk with the share of the file read so far.
+    """
+    sample = read_sales_csv(file_path, nrows=SAMPLE_ROWS)
+    if len(sample) < SAMPLE_ROWS:
+        yield clean_frame(sample)
+        return
+    rows = chunk_rows(sample, memory_mb)
+    del sample
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        with pd.read_csv(f, quotechar='"', skipinitialspace=True, chunksize=rows) as reader:
+            for raw in reader:
+                raw.columns = raw.columns.str.strip()
+                yield clean_frame(raw)
+                if progress is not None:
+                    done = min(f.tell() / size, 1.0) if size else 1.0
+                    progress(done, f"Loading sales data... {done * size / 1e6:,.0f} of {size / 1e6:,.0f} MB")
+
+
+# --- Columnar cache ---
+# The cleaned frame is stored as one or more uncompressed Feather (Arrow IPC)
+# parts so later loads can memory-map them instead of re-parsing the CSV. A
+# JSON sidecar lists the parts and records the source file's size, mtime and
+# the content hash of every byte range ingested so far. Size and mtime are
+# checked first; if the mtime moved (e.g. a fresh checkout on redeploy) the
+# content hashes decide whether the cache is still valid.
+#
+# Incremental ingests (see ingest) clean only rows appended to the source or
+# new delta files and add them as a new part, together with the sorted
+# transaction keys used to drop duplicates.
+
+def _cache_base(file_path):
+    source = os.path.abspath(file_path)
+    return os.path.join(os.path.dirname(source), CACHE_DIR_NAME, os.path.basename(source))
+
+
+def _part_paths(file_path, part):
+    base = f"{_cache_base(file_path)}.{part}"
+    return base + '.feather', base + '.keys.npy'
+
+
+def _hash_bytes(f, start, end, block_size=1 << 20):
+    digest = hashlib.blake2b(digest_size=16)
+    f.seek(start)
+    remaining = end - start
+    while remaining > 0:
+        block = f.read(min(block_size, remaining))
+        if not block:
+            break
+        digest.update(block)
+        remaining -= len(block)
+    return digest.hexdigest()
+
+
+def _tail_hash(f, size):
+    return _hash_bytes(f, max(0, size - TAIL_BYTES), size)
+
+
+def _read_meta(file_path):
+    try:
+        with open(_cache_base(file_path) + '.json') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return meta if meta.get('version') == CACHE_VERSION else None
+
+
+def _write_json(path, obj):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(obj, f)
+    os.replace(tmp_path, path)
+
+
+def _cache_status(file_path, meta):
+    """
+    Compare the source file against the cache metadata. Returns 'valid',
+    'appended' (the old content is unchanged and new rows follow it) or None.
+    """
+    if meta is None:
+        return None
+    stat = os.stat(file_path)
+    with open(file_path, 'rb') as f:
+        if stat.st_size == meta['size']:
+            if stat.st_mtime_ns != meta['mtime_ns']:
+                if any(_hash_bytes(f, start, end) != h for start, end, h in meta['segments']):
+                    return None
+                # Same content, new mtime: refresh the key so the next load takes the fast path
+                meta['mtime_ns'] = stat.st_mtime_ns
+                _write_json(_cache_base(file_path) + '.json', meta)
+            return 'valid'
+        if stat.st_size > meta['size'] and meta['size'] > 0:
+            # Appends must start on a new line after an unchanged tail
+            f.seek(meta['size'] - 1)
+            if f.read(1) == b'\n' and _tail_hash(f, meta['size']) == meta['tail']:
+                return 'appended'
+    return None
+
+
+def _read_parts(file_path, meta, parts=None):
+    parts = meta['parts'] if parts is None else parts
+    tables = [feather.read_table(_part_paths(file_path, part)[0], memory_map=True) for part in parts]
+    table = tables[0] if len(tables) == 1 else pyarrow.concat_tables(tables)
+    # With one block per column, pandas uses the memory-mapped buffer as it is
+    # for a plain numeric or date column without missing values in a single
+    # record batch (one part), so only those columns are read-only views of
+    # the file that every process shares through the OS page cache. Columns
+    # with missing values, nullable integers, strings and categorical codes
+    # are copied into each process
+    df = table.to_pandas(split_blocks=True)
+    for col in df.columns:
+        # Each part's dictionaries are written sorted, but joining several
+        # parts appends the later parts' new categories
+        if isinstance(df[col].dtype, pd.CategoricalDtype) and not df[col].cat.categories.is_monotonic_increasing:
+            df[col] = df[col].cat.set_categories(df[col].cat.categories.sort_values())
+    return df
+
+
+def _write_part(file_path, meta, df, keys):
+    part = meta['next_part']
+    meta['next_part'] += 1
+    data_path, keys_path = _part_paths(file_path, part)
+    os.makedirs(os.path.dirname(data_path), exist_ok=True)
+    table = pyarrow.Table.from_pandas(df.reset_index(drop=True), preserve_index=False)
+    if meta['parts']:
+        # Later batches are stored with the first part's schema so the parts
+        # concatenate cleanly even when a batch has e.g. an all-empty column
+        first_path = _part_paths(file_path, meta['parts'][0])[0]
+        schema = pyarrow.ipc.open_file(pyarrow.memory_map(first_path)).schema
+        table = table.select(schema.names).cast(schema)
+    _write_feather(table, data_path)
+    np.save(keys_path, np.sort(keys))
+    meta['parts'].append(part)
+
+
+def _write_streamed_part(file_path, meta, chunks):
+    """
+    Write cleaned chunks to a new cache part one record batch at a time, so
+    the raw data of the whole file is never held in memory. Categoricals keep
+    one growing dictionary per column (stored as deltas); the part is then
+    rewritten once with sorted dictionaries (see _finish_streamed_part).
+    """
+    part = meta['next_part']
+    meta['next_part'] += 1
+    data_path, keys_path = _part_paths(file_path, part)
+    # Named like a part so _commit_meta removes it if a crash leaves it behind
+    stream_path = data_path[:-len('.feather')] + '.stream.feather'
+    os.makedirs(os.path.dirname(data_path), exist_ok=True)
+    categories, keys = {}, []
+    writer = None
+    try:
+        for chunk in chunks:
+            chunk = chunk.reset_index(drop=True)
+            for col in chunk.columns:
+                if isinstance(chunk[col].dtype, pd.CategoricalDtype):
+                    # Stored as strings, so every chunk adds to the same string dictionary
+                    chunk[col] = chunk[col].cat.rename_categories(chunk[col].cat.categories.astype(str))
+                    known = categories.setdefault(col, [])
+                    seen = set(known)
+                    known.extend(c for c in chunk[col].cat.categories if c not in seen)
+                    if not known:
+                        # Arrow files cannot grow an empty dictionary (that is a
+                        # replacement, not a delta), so a column that starts out
+                        # all missing gets a placeholder, dropped again when unused
+                        known.append(DICTIONARY_PLACEHOLDER)
+                    chunk[col] = chunk[col].cat.set_categories(pd.Index(known, dtype=str))
+            table = pyarrow.Table.from_pandas(chunk, preserve_index=False)
+            if writer is None:
+                # Fixed index width, since a dictionary may outgrow the first chunk's int8 codes
+                schema = pyarrow.schema([
+                    pyarrow.field(f.name, pyarrow.dictionary(pyarrow.int32(), pyarrow.string()))
+                    if pyarrow.types.is_dictionary(f.type) else f
+                    for f in table.schema
+                ], metadata=table.schema.metadata)
+                options = pyarrow.ipc.IpcWriteOptions(emit_dictionary_deltas=True)
+                writer = pyarrow.ipc.new_file(stream_path, schema, options=options)
+            writer.write_table(table.select(schema.names).cast(schema))
+            keys.append(transaction_keys(chunk))
+    finally:
+        if writer is not None:
+            writer.close()
+    _finish_streamed_part(stream_path, data_path)
+    np.save(keys_path, np.sort(np.concatenate(keys)))
+    meta['parts'].append(part)
+
+
+def _finish_streamed_part(stream_path, data_path):
+    """
+    Rewrite a streamed part as one record batch with each dictionary sorted,
+    so loads need not re-code the categoricals and columns that pandas can
+    use as they are stay views of the file. This holds the compact table in
+    memory once, as loading it does.
+    """
+    with pyarrow.memory_map(stream_path) as source:
+        table = pyarrow.ipc.open_file(source).read_all().unify_dictionaries()
+        columns = [column.combine_chunks() for column in table.columns]
+        for i, column in enumerate(columns):
+            if pyarrow.types.is_dictionary(column.type):
+                columns[i] = _sort_dictionary(column)
+        table = pyarrow.Table.from_arrays(columns, schema=table.schema)
+        _write_feather(table, data_path)
+    os.remove(stream_path)
+
+
+def _sort_dictionary(array):
+    """
+    The dictionary array with its values sorted and the streaming placeholder
+    dropped when no row uses it.
+    """
+    values = array.dictionary.to_pylist()
+    order = [int(i) for i in np.argsort(np.array(values, dtype=object), kind='stable')]
+    if DICTIONARY_PLACEHOLDER in values:
+        placeholder = values.index(DICTIONARY_PLACEHOLDER)
+        if not pyarrow.compute.any(pyarrow.compute.equal(array.indices, placeholder)).as_py():
+            order.remove(placeholder)
+    remap = np.zeros(len(values), dtype=np.int32)
+    remap[order] = np.arange(len(order), dtype=np.int32)
+    indices = pyarrow.compute.take(pyarrow.array(remap), array.indices)
+    return pyarrow.DictionaryArray.from_arrays(indices, array.dictionary.take(pyarrow.array(order, type=pyarrow.int64())))
+
+
+def _write_feather(table, data_path):
+    # One record batch: a column split over several batches is concatenated
+    # (copied) when loaded, instead of being used in place
+    feather.write_feather(table, data_path, compression='uncompressed', chunksize=max(len(table), 1))
+
+
+def _commit_meta(file_path, meta):
+    """
+    Publish new metadata, then remove parts it no longer references. Parts
+    are never overwritten, so a crash before this point leaves the old cache intact.
+    """
+    base = _cache_base(file_path)
+    _write_json(base + '.json', meta)
+    keep = set()
+    for part in meta['parts']:
+        keep.update(os.path.basename(p) for p in _part_paths(file_path, part))
+    prefix = os.path.basename(base) + '.'
+    for name in os.listdir(os.path.dirname(base)):
+        if name.startswith(prefix) and name.endswith(('.feather', '.keys.npy')) and name not in keep:
+            try:
+                os.remove(os.path.join(os.path.dirname(base), name))
+            except OSError:
+                # Still memory-mapped by a running process (Windows); removed on a later commit
+                pass
+
+
+def read_cache(file_path):
+    """
+    Return the cached cleaned frame for file_path, or None if there is no valid
+    cache. A stale or unreadable cache is treated as missing.
+    """
+    if feather is None:
+        return None
+    meta = _read_meta(file_path)
+    try:
+        if _cache_status(file_path, meta) != 'valid':
+            return None
+        return _read_parts(file_path, meta)
+    except Exception as e:
+        print(f"Ignoring unreadable cache for {file_path}: {e}")
+        return None
+
+
+def _new_meta(file_path, key=None):
+    meta = key if key is not None else _source_key(file_path)
+    old = _read_meta(file_path)
+    meta['next_part'] = old['next_part'] if old else 0
+    meta['parts'] = []
+    meta['delta_parts'] = []
+    meta['deltas'] = {}
+    return meta
+
+
+def write_cache(file_path, df, key=None):
+    """
+    Replace the cache for file_path with the full cleaned frame. Pass the key
+    taken before the source was read so a file changed mid-load is not cached
+    under its new key. Failures are reported but never fail the load.
+    """
+    if feather is None:
+        return
+    try:
+        meta = _new_meta(file_path, key)
+        _write_part(file_path, meta, df, transaction_keys(df))
+        _commit_meta(file_path, meta)
+    except Exception as e:
+        print(f"Could not write cache for {file_path}: {e}")
+
+
+def _source_key(file_path):
+    stat = os.stat(file_path)
+    with open(file_path, 'rb') as f:
+        return {
+            'version': CACHE_VERSION,
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'segments': [[0, stat.st_size, _hash_bytes(f, 0, stat.st_size)]],
+            'tail': _tail_hash(f, stat.st_size),
+        }
+
+
+def _drop_known(file_path, df, parts):
+    """
+    Drop the rows of a new batch that the given cache parts already hold,
+    matched by multiplicity: a transaction key cached n times absorbs the
+    first n copies of it in the batch. Copies within a batch are all kept,
+    since identical sales (e.g. bulk off-plan units) are legitimate. Each
+    part's keys are sorted, so the lookup costs O(batch * log history).
+    """
+    keys = transaction_keys(df)
+    known = np.zeros(len(df), dtype=np.int64)
+    for part in parts:
+        cached = np.load(_part_paths(file_path, part)[1], mmap_mode='r')
+        known += np.searchsorted(cached, keys, side='right') - np.searchsorted(cached, keys, side='left')
+    # Position of each row among the batch rows with the same key
+    copy = pd.Series(keys).groupby(keys).cumcount().to_numpy()
+    keep = copy >= known
+    return df[keep], keys[keep]
+
+
+def _compact(file_path, meta):
+    """
+    Merge the parts into at most two: the sales file's rows, then the rows
+    from delta files, so later appends can still be matched against the
+    delta rows alone.
+    """
+    delta_parts = set(meta['delta_parts'])
+    groups = [
+        ([p for p in meta['parts'] if p not in delta_parts], False),
+        ([p for p in meta['parts'] if p in delta_parts], True),
+    ]
+    meta['parts'], meta['delta_parts'] = [], []
+    for parts, from_deltas in groups:
+        if parts:
+            df = _read_parts(file_path, meta, parts)
+            _write_part(file_path, meta, df, transaction_keys(df))
+            if from_deltas:
+                meta['delta_parts'].append(meta['parts'][-1])
+    return _read_parts(file_path, meta)
+
+
+def _stale_deltas(file_path, meta, delta_paths):
+    """
+    True if a delta file in the cache was edited or is no longer among
+    delta_paths. Deltas that were only touched get their new mtime recorded.
+    """
+    current = {os.path.abspath(p) for p in delta_paths}
+    touched = False
+    for delta_path, (size, mtime_ns, digest) in meta['deltas'].items():
+        if delta_path not in current:
+            print(f"Delta file {delta_path} was removed, rebuilding the cache for {file_path}")
+            return True
+        stat = os.stat(delta_path)
+        if [stat.st_size, stat.st_mtime_ns] == [size, mtime_ns]:
+            continue
+        with open(delta_path, 'rb') as f:
+            if stat.st_size != size or _hash_bytes(f, 0, size) != digest:
+                print(f"Delta file {delta_path} changed, rebuilding the cache for {file_path}")
+                return True
+        meta['deltas'][delta_path] = [size, stat.st_mtime_ns, digest]
+        touched = True
+    if touched:
+        _write_json(_cache_base(file_path) + '.json', meta)
+    return False
+
+
+def ingest(file_path, delta_paths=(), memory_mb=LOAD_MEMORY_MB, progress=None):
+    """
+    Bring the cached frame for file_path up to date and return (df, error).
+
+    Rows appended to file_path since the last load and any delta files not
+    ingested before are cleaned on their own and stored as a new cache part,
+    so the cost scales with the size of the new data. Any other change to
+    file_path triggers a full rebuild, streamed chunk by chunk into the cache
+    within memory_mb (see clean_chunks), after which the delta files are
+    ingested again.
+
+    Duplicates are resolved the way a full rebuild would (see _drop_known):
+    rows of file_path are all kept, except appended rows that were already
+    ingested from a delta file; a delta file's rows are matched against
+    everything cached. A delta file that was edited or left out of
+    delta_paths since it was ingested triggers a full rebuild.
+    """
+    if feather is None:
+        return load_data(file_path, use_cache=False, memory_mb=memory_mb, progress=progress)
+    try:
+        meta = _read_meta(file_path)
+        try:
+            status = _cache_status(file_path, meta)
+        except Exception as e:
+            print(f"Ignoring unreadable cache for {file_path}: {e}")
+            status = None
+
+        if status is not None and _stale_deltas(file_path, meta, delta_paths):
+            # Rows of an edited or dropped delta file are mixed into the cache
+            # and matched against later batches, so only a rebuild can take them out
+            status = None
+
+        changed = False
+        if status is None:
+            # Full rebuild, streamed into a new part
+            meta = _new_meta(file_path)
+            try:
+                _write_streamed_part(file_path, meta, clean_chunks(file_path, memory_mb, progress))
+                _commit_meta(file_path, meta)
+            except Exception as e:
+                # The cache could not be written, serve the frame uncached
+                print(f"Could not write cache for {file_path}: {e}")
+                return load_data(file_path, use_cache=False, memory_mb=memory_mb, progress=progress)
+
+        if status == 'appended':
+            stat = os.stat(file_path)
+            with open(file_path, 'rb') as f:
+                header = f.readline()
+                f.seek(meta['size'])
+                new_rows = f.read(stat.st_size - meta['size'])
+                meta['segments'].append([meta['size'], stat.st_size, hashlib.blake2b(new_rows, digest_size=16).hexdigest()])
+                meta['tail'] = _tail_hash(f, stat.st_size)
+            meta['size'] = stat.st_size
+            meta['mtime_ns'] = stat.st_mtime_ns
+            batch = clean_frame(read_sales_csv(io.BytesIO(header + new_rows)))
+            batch, keys = _drop_known(file_path, batch, meta['delta_parts'])
+            _write_part(file_path, meta, batch, keys)
+            changed = True
+
+        for delta_path in delta_paths:
+            delta_path = os.path.abspath(delta_path)
+            if delta_path in meta['deltas']:
+                # Checked unchanged by _stale_deltas
+                continue
+            stat = os.stat(delta_path)
+            with open(delta_path, 'rb') as f:
+                digest = _hash_bytes(f, 0, stat.st_size)
+            batch = clean_frame(read_sales_csv(delta_path))
+            batch, keys = _drop_known(file_path, batch, meta['parts'])
+            _write_part(file_path, meta, batch, keys)
+            meta['delta_parts'].append(meta['parts'][-1])
+            meta['deltas'][delta_path] = [stat.st_size, stat.st_mtime_ns, digest]
+            changed = True
+
+        if not changed:
+            return _read_parts(file_path, meta), None
+
+        df = _compact(file_path, meta) if len(meta['parts']) > MAX_CACHE_PARTS else _read_parts(file_path, meta)
+        _commit_meta(file_path, meta)
+        return df, None
+
+    except Exception as e:
+        error_msg = f"Error loading data: {e}"
+        print(error_msg)
+        return None, error_msg
+
+
+def cache_key(source):
+    """
+    Fingerprint of the cleaned data for a file, directory or glob, read from
+    the cache metadata of the last load instead of the data itself. None when
+    a file has no cache matching its current size and modification time.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for path in expand_sources(source):
+        meta = _read_meta(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if meta is None or [meta['size'], meta['mtime_ns']] != [stat.st_size, stat.st_mtime_ns]:
+            return None
+        # Part numbers are never reused, so any new or re-cleaned row changes them
+        fields = [os.path.abspath(path), meta['version'], meta['segments'], meta['parts'], meta['deltas']]
+        digest.update(json.dumps(fields).encode())
+    return digest.hexdigest()
+
+
+# --- Sharded sources ---
+# A source can be one file, a directory of shards (e.g. one file per
+# year/emirate) or a glob. Shards are loaded in parallel worker processes,
+# each through its own cache, and concatenated with a unified schema.
+
+SHARD_PATTERNS = ('*.txt', '*.csv')
+
+
+def expand_sources(source):
+    """
+    Sorted shard files for a file, directory or glob pattern.
+    """
+    if os.path.isfile(source):
+        return [source]
+    if os.path.isdir(source):
+        return sorted(p for pattern in SHARD_PATTERNS for p in glob.glob(os.path.join(source, pattern)))
+    if glob.has_magic(source):
+        return sorted(glob.glob(source))
+    return [source]
+
+
+def _load_shard(path, use_cache, memory_mb=LOAD_MEMORY_MB):
+    """
+    Worker: load one shard. With a cache the frame stays on disk and the
+    parent memory-maps it, instead of pickling it back across processes.
+    """
+    df, error = load_data(path, use_cache=use_cache, memory_mb=memory_mb)
+    if error:
+        return None, error
+    if use_cache and _read_meta(path) is not None:
+        return None, None
+    return df, None
+
+
+def concat_frames(frames):
+    """
+    Concatenate cleaned frames, unioning categorical columns' categories so
+    they stay categorical instead of falling back to object.
+    """
+    frames = [f for f in frames if f is not None]
+    if len(frames) == 1:
+        return frames[0]
+    frames = [f.copy(deep=False) for f in frames]
+    for col in CATEGORY_COLS:
+        if all(col in f.columns and isinstance(f[col].dtype, pd.CategoricalDtype) for f in frames):
+            categories = sorted(set().union(*(f[col].cat.categories for f in frames)))
+            for f in frames:
+                f[col] = f[col].cat.set_categories(categories)
+    return pd.concat(frames, ignore_index=True)
+
+
+def load_shards(paths, use_cache=True, workers=None, memory_mb=LOAD_MEMORY_MB, progress=None):
+    """
+    Load and clean several shards in parallel (workers defaults to the CPU
+    count) and return (df, error) for their concatenation in path order.
+    The memory budget is split between the workers; progress is reported
+    per shard.
+    """
+    try:
+        if not paths:
+            return None, "Error loading data: no sales files found"
+        workers = min(workers or os.cpu_count() or 1, len(paths))
+        shard_mb = memory_mb / workers
+        args = (paths, [use_cache] * len(paths), [shard_mb] * len(paths))
+        results = []
+        # Spawned, not forked: the Streamlit server is multi-threaded, and forking
+        # a threaded process can deadlock the workers
+        context = multiprocessing.get_context('spawn')
+        with (ProcessPoolExecutor(max_workers=workers, mp_context=context) if workers > 1 else nullcontext()) as pool:
+            for result in (pool.map if pool else map)(_load_shard, *args):
+                results.append(result)
+                if progress is not None:
+                    progress(len(results) / len(paths), f"Loading sales data... {len(results)} of {len(paths)} files")
+
+        frames = []
+        for path, (df, error) in zip(paths, results):
+            if error:
+                return None, error
+            if df is None:
+                df = read_cache(path)
+            if df is None:
+                # Cache changed under us, fall back to a direct load
+                df, error = load_data(path, use_cache=False, memory_mb=shard_mb)
+                if error:
+                    return None, error
+            frames.append(df)
+        return concat_frames(frames), None
+
+    except Exception as e:
+        error_msg = f"Error loading data: {e}"
+        print(error_msg)
+        return None, error_msg
+
+
+def load_data(file_path, use_cache=True, workers=None, memory_mb=LOAD_MEMORY_MB, progress=None):
     """
     Load and clean the real estate data.
+
+    file_path may be a single file, a directory of shards or a glob; shards
+    are loaded in parallel (see load_shards). With use_cache the cleaned
+    frame is served from the columnar cache next to each file (see ingest),
+    which is built or updated as needed. Files are parsed and cleaned in
+    chunks within a working-memory budget of memory_mb; progress(fraction,
+    text) is called as the load advances.
     """
+    paths = expand_sources(file_path)
+    if paths != [file_path]:
+        return load_shards(paths, use_cache, workers, memory_mb, progress)
+    if use_cache:
+        return ingest(file_path, memory_mb=memory_mb, progress=progress)
     try:
         # Read the file
-        df = pd.read_csv(file_path, quotechar='"', skipinitialspace=True)
-        
-        # Clean column names (strip whitespace)
-        df.columns = df.columns.str.strip()
-        
-        # Function to clean currency/area strings
-        def clean_currency(x):
-            if isinstance(x, str):
-                return pd.to_numeric(x.replace('AED', '').replace(',', '').strip(), errors='coerce')
-            return x
-
-        def clean_area(x):
-            if isinstance(x, str):
-                # Handle '-' as NaN
-                if x.strip() == '-':
-                    return np.nan
-                return pd.to_numeric(x.replace('sqm', '').replace(',', '').strip(), errors='coerce')
-            return x
-            
-        def clean_rate(x):
-             if isinstance(x, str):
-                if x.strip() == '-' or x.strip() == '':
-                    return np.nan
-                return pd.to_numeric(x.replace('AED/sqm', '').replace(',', '').strip(), errors='coerce')
-             return x
-
-        # Clean Price
-        df['Price (AED)'] = df['Price (AED)'].apply(clean_currency)
-        
-        # Clean Areas
-        df['Sold Area (sqm)'] = df['Sold Area (sqm)'].apply(clean_area)
-        df['Plot Area (sqm)'] = df['Plot Area (sqm)'].apply(clean_area)
-        
-        # Clean Rate
-        df['Rate (AED/sqm)'] = df['Rate (AED/sqm)'].apply(clean_rate)
-        
-        # Clean Registration Date
-        df['Registration'] = pd.to_datetime(df['Registration'], dayfirst=True, errors='coerce')
-        
-        # Calculate derived Rate if missing
-        # Prefer Sold Area, then Plot Area
-        df['Effective Area'] = df['Sold Area (sqm)'].fillna(df['Plot Area (sqm)'])
-        
-        # Calculate Rate where missing
-        # Note: We are assuming Price is for the given Share.
-        # To get a comparable Market Rate (Valuation Rate), strictly we should assume 
-        # Rate = (Price / Share_Percentage) / Area  OR Price / (Area * Share_Percentage)
-        # However, 'Share' column is string like '50%'.
-        def clean_share(x):
-            if isinstance(x, str):
-                return pd.to_numeric(x.replace('%', '').strip(), errors='coerce') / 100.0
-            return 1.0 # Default to 100% if missing/numeric 1
-
-        df['Share_Value'] = df['Share'].apply(clean_share).fillna(1.0)
-        
-        # Calculated Rate = Price / (Effective Area * Share_Value)
-        # Avoid division by zero
-        mask = (df['Rate (AED/sqm)'].isna()) & (df['Effective Area'] > 0) & (df['Price (AED)'] > 0)
-        df.loc[mask, 'Rate (AED/sqm)'] = df.loc[mask, 'Price (AED)'] / (df.loc[mask, 'Effective Area'] * df.loc[mask, 'Share_Value'])
-        
-        # Drop rows where we still don't have a valid Rate or Price or Registration date?
-        # For the dashboard, we might want to keep them but filter in charts.
-        # Let's keep them and handle in charts.
-        
+        df = concat_frames(clean_chunks(file_path, memory_mb, progress))
         return df, None
         
     except Exception as e:
@@ -79,8 +846,9 @@ def load_data(file_path):
         return None, error_msg
 
 if __name__ == "__main__":
-    # Test loading
-    df = load_data('d:/AI Projects/recent_sales.txt')
+    # Test loading: python data_loader.py [sales file]
+    source = sys.argv[1] if len(sys.argv) > 1 else 'recent_sales.txt'
+    df = clean_frame(read_sales_csv(source), report=True)
     if df is not None:
         print("Data loaded successfully.")
         print(df.head())
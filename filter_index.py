@@ -0,0 +1,139 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+# Selectors in cascade order: each dropdown's options depend on the
+# selections made in the dropdowns before it.
+GEO_DIMENSIONS = ['District', 'Community', 'Project', 'Year']
+DETAIL_DIMENSIONS = ['Asset Type', 'Property Type', 'Sale Type', 'Sequence']
+DIMENSIONS = GEO_DIMENSIONS + DETAIL_DIMENSIONS
+
+# Bound on memoized option lists / row selections (one entry per parent selection)
+MAX_CACHED_SELECTIONS = 4096
+
+
+def _smallest_int_dtype(n):
+    return np.int8 if n < 2**7 else np.int16 if n < 2**15 else np.int32
+
+
+class FilterIndex:
+    """
+    Inverted index over the sidebar/detail filter dimensions, built once per
+    dataset. Each dimension stores its values as integer codes plus the row
+    positions of every value grouped together (an argsort of the codes), so a
+    filter combination resolves to row positions by walking the smallest
+    posting list instead of masking the full frame for every selector.
+    """
+
+    def __init__(self, df, dimensions=DIMENSIONS):
+        self.n_rows = len(df)
+        self.dimensions = [d for d in dimensions if d in df.columns]
+        pos_dtype = np.int32 if self.n_rows < 2**31 else np.int64
+
+        self._codes = {}
+        self._values = {}
+        self._lookup = {}
+        self._order = {}
+        self._bounds = {}
+        for dim in self.dimensions:
+            # sort=True keeps option lists in the same order as sorted(unique())
+            codes, uniques = pd.factorize(df[dim], sort=True)
+            values = [v.item() if isinstance(v, np.generic) else v for v in uniques]
+            codes = codes.astype(_smallest_int_dtype(len(values) + 1))
+
+            # Rows of value k are order[bounds[k]:bounds[k + 1]], in ascending row order
+            order = np.argsort(codes, kind='stable').astype(pos_dtype)
+            bounds = np.searchsorted(codes[order], np.arange(len(values) + 1))
+
+            self._codes[dim] = codes
+            self._values[dim] = values
+            self._lookup[dim] = {v: k for k, v in enumerate(values)}
+            self._order[dim] = order
+            self._bounds[dim] = bounds
+
+        # LRU memos shared by every session thread, guarded by _lock
+        self._options_cache = OrderedDict()
+        self._rows_cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _posting(self, dim, code):
+        bounds = self._bounds[dim]
+        return self._order[dim][bounds[code]:bounds[code + 1]]
+
+    def _cached(self, cache, key):
+        with self._lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+
+    def _remember(self, cache, key, value):
+        with self._lock:
+            cache[key] = value
+            while len(cache) > MAX_CACHED_SELECTIONS:
+                cache.popitem(last=False)
+
+    @staticmethod
+    def _key(selection):
+        return tuple(sorted((dim, value) for dim, value in selection.items() if value != "All"))
+
+    def rows(self, selection):
+        """
+        Row positions (ascending) matching every {dimension: value} in
+        selection, or None when nothing is selected (all rows). "All" values
+        are ignored.
+        """
+        key = self._key(selection)
+        if not key:
+            return None
+        cached = self._cached(self._rows_cache, key)
+        if cached is not None:
+            return cached
+
+        codes = []
+        for dim, value in key:
+            code = self._lookup[dim].get(value)
+            if code is None:
+                rows = np.empty(0, dtype=np.int64)
+                break
+            codes.append((dim, code))
+        else:
+            # Start from the smallest posting list and check the other
+            # dimensions' codes only at those rows
+            codes.sort(key=lambda dc: self._bounds[dc[0]][dc[1] + 1] - self._bounds[dc[0]][dc[1]])
+            rows = self._posting(*codes[0])
+            for dim, code in codes[1:]:
+                rows = rows[self._codes[dim][rows] == code]
+
+        self._remember(self._rows_cache, key, rows)
+        return rows
+
+    def options(self, dim, selection):
+        """
+        Sorted distinct values of dim among the rows matching selection,
+        memoized per parent selection.
+        """
+        key = (dim,) + self._key(selection)
+        cached = self._cached(self._options_cache, key)
+        if cached is not None:
+            return cached
+
+        rows = self.rows(selection)
+        if rows is None:
+            options = list(self._values[dim])
+        else:
+            present = np.unique(self._codes[dim][rows])
+            values = self._values[dim]
+            options = [values[k] for k in present if k >= 0]
+
+        self._remember(self._options_cache, key, options)
+        return options
+
+    def select(self, df, selection):
+        """
+        Rows of df matching selection. df must be the frame the index was built on.
+        """
+        rows = self.rows(selection)
+        return df if rows is None else df.take(rows)
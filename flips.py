@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+from indicators import INCOMPLETE_QUARTER
+
+# Property attributes for identification
+PROPERTY_COLS = ['Sold Area (sqm)', 'Plot Area (sqm)', 'Layout', 'District', 'Community', 'Project']
+# Holding windows offered in the dashboard; any window works without recomputing
+HOLDING_WINDOWS = [90, 183, 365]
+DEFAULT_HOLDING_WINDOW = 183
+# Flips below this price (either side) are not market-rate sales
+MIN_MARKET_PRICE = 10000
+# Appreciation outside this range is treated as an outlier
+APPRECIATION_RANGE = (-0.8, 5)
+
+
+def can_detect_flips(df):
+    return any(c in df.columns for c in PROPERTY_COLS) and 'Registration' in df.columns and 'Sequence' in df.columns
+
+
+class FlipEngine:
+    """
+    Pairs every transaction with the previous transaction of the same
+    property, once per dataset. The property identity (PROPERTY_COLS) is
+    factorized into a single integer key and the transactions are ordered
+    by (key, Registration) in one stable sort, so the previous sale is the
+    neighbouring row. Filtered views then only aggregate the precomputed
+    per-transaction results for the selected rows.
+
+    Transactions with a missing property attribute are not paired, like
+    rows with a missing key in groupby.
+    """
+
+    def __init__(self, df):
+        prop_cols = [c for c in PROPERTY_COLS if c in df.columns]
+        n = len(df)
+
+        # Single integer property key, -1 where an attribute is missing
+        # (ngroup gives NaN for those rows)
+        self.property_key = df.groupby(prop_cols, observed=True, sort=False).ngroup().fillna(-1).to_numpy(dtype=np.int64)
+
+        # Missing dates sort last within a property, as in sort_values
+        reg = df['Registration'].to_numpy().astype('datetime64[s]').astype(np.int64)
+        reg_missing = df['Registration'].isna().to_numpy()
+        reg_sort = np.where(reg_missing, np.iinfo(np.int64).max, reg)
+        order = np.lexsort((reg_sort, self.property_key))
+
+        # Previous transaction of the same property, -1 if none
+        self.prev = np.full(n, -1, dtype=np.int64)
+        same = (self.property_key[order[1:]] == self.property_key[order[:-1]]) & (self.property_key[order[1:]] >= 0)
+        self.prev[order[1:][same]] = order[:-1][same]
+
+        has_prev = self.prev >= 0
+        prev = np.where(has_prev, self.prev, 0)
+        price = df['Price (AED)'].to_numpy(dtype='float64')
+        prev_price = np.where(has_prev, price[prev], np.nan)
+
+        # Days since the previous transaction (of any kind for this property)
+        valid = has_prev & ~reg_missing & ~reg_missing[prev]
+        self.days_since_last = np.where(valid, np.floor_divide(reg - reg[prev], 86400), np.nan).astype('float32')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.appreciation = np.where(prev_price != 0, (price - prev_price) / prev_price, np.nan)
+        self.market_rate = (price > MIN_MARKET_PRICE) & (prev_price > MIN_MARKET_PRICE)
+
+        # A Year filter cuts off earlier sales, so pairs across years only count unfiltered
+        year = df['Year'].to_numpy(dtype='float64', na_value=np.nan) if 'Year' in df.columns else np.full(n, np.nan)
+        self.prev_same_year = has_prev & (year == year[prev])
+
+        # Identify resales: transactions with Sequence 'Secondary'
+        self.is_resale = (df['Sequence'] == 'Secondary').to_numpy(dtype=bool, na_value=False)
+
+        codes, quarters = pd.factorize(df['Quarter'], sort=True)
+        self.quarter_codes = codes
+        self.quarters = [str(q) for q in quarters]
+
+    def stats(self, rows=None, window_days=DEFAULT_HOLDING_WINDOW, same_year_only=False):
+        """
+        Quarterly flip rate and mean flip appreciation for the selected rows
+        (positions, None for all). A flip is a resale more than 0 and at most
+        window_days after the previous sale. Set same_year_only when the rows
+        are filtered to a single Year. Returns (flip_df, apprec_df).
+        """
+        take = (lambda a: a) if rows is None else (lambda a: a[rows])
+        q = take(self.quarter_codes)
+        days = take(self.days_since_last)
+        if same_year_only:
+            days = np.where(take(self.prev_same_year), days, np.nan)
+        is_resale = take(self.is_resale)
+        is_flip = is_resale & (days > 0) & (days <= window_days)
+
+        present = q >= 0
+        q, is_resale, is_flip = q[present], is_resale[present], is_flip[present]
+        nq = len(self.quarters)
+        counts = np.bincount(q, minlength=nq)
+        resale_stats = pd.DataFrame({
+            'Quarter': self.quarters,
+            'total_resales': np.bincount(q, weights=is_resale, minlength=nq).astype(np.int64),
+            'flips': np.bincount(q, weights=is_flip, minlength=nq).astype(np.int64),
+        })[counts > 0]
+        resale_stats['Flip Rate (%)'] = (resale_stats['flips'] / resale_stats['total_resales'].replace(0, 1)) * 100
+
+        # Appreciation Stats: Mean of market-rate flips within the outlier range
+        appreciation = take(self.appreciation)[present]
+        low, high = APPRECIATION_RANGE
+        kept = is_flip & take(self.market_rate)[present] & (appreciation < high) & (appreciation > low)
+        n_kept = np.bincount(q[kept], minlength=nq)
+        total = np.bincount(q[kept], weights=appreciation[kept], minlength=nq)
+        apprec_stats = pd.DataFrame({'Quarter': self.quarters, 'appreciation': total / np.maximum(n_kept, 1)})[n_kept > 0]
+        apprec_stats['Flip Price Appreciation (%)'] = apprec_stats['appreciation'] * 100
+
+        # Filter out current incomplete quarter
+        flip_df = resale_stats[resale_stats['Quarter'] != INCOMPLETE_QUARTER].reset_index(drop=True)
+        apprec_df = apprec_stats[apprec_stats['Quarter'] != INCOMPLETE_QUARTER].reset_index(drop=True)
+        return flip_df, apprec_df
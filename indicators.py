@@ -0,0 +1,112 @@
+import numpy as np
+import pandas as pd
+
+# The current quarter is still in progress, so it is left out of the indicators
+INCOMPLETE_QUARTER = '2026Q1'
+# Growth rates above this are treated as outliers (tiny base quarters) and blanked
+MAX_GROWTH_PCT = 600
+# Selections computed when the server starts: "All" plus the busiest districts
+PRECOMPUTE_TOP_DISTRICTS = 5
+
+
+def offplan_ready_ratio(base_counts, quarters):
+    """
+    Off-plan / Ready transaction ratio per quarter for Residential and
+    Commercial. base_counts has one row per Quarter, Asset Type, Sale Type
+    with a 'count' column. quarters lists every quarter in the selection.
+    """
+    def calc_ratio(asset):
+        sub = base_counts[base_counts['Asset Type'] == asset]
+        if sub.empty:
+            # Return empty DF with expected columns filled with NaN to avoid ShapeError
+            return pd.DataFrame({f'{asset} Offplan/Ready': [np.nan] * len(quarters)}, index=quarters)
+
+        pivot = sub.pivot(index='Quarter', columns='Sale Type', values='count').fillna(0)
+
+        # Ensure both columns exist for calculation
+        for col in ['Off-plan', 'Ready']:
+            if col not in pivot.columns:
+                pivot[col] = 0
+
+        pivot[f'{asset} Offplan/Ready'] = pivot['Off-plan'] / pivot['Ready'].replace(0, 1)
+        return pivot[[f'{asset} Offplan/Ready']]
+
+    res_ratio = calc_ratio('Residential')
+    com_ratio = calc_ratio('Commercial')
+
+    ratio_df = res_ratio.join(com_ratio, how='outer').reset_index().sort_values('Quarter')
+    ratio_df = ratio_df.rename(columns={'index': 'Quarter'}) # Handle index rename from join
+
+    # Exclude the incomplete quarter
+    return ratio_df[ratio_df['Quarter'] != INCOMPLETE_QUARTER]
+
+
+def sales_growth(growth_counts, periods, label):
+    """
+    Growth rate (%) of the Residential and Commercial transaction counts over
+    `periods` quarters. growth_counts is indexed by Quarter with one column per
+    Asset Type. label ('QoQ' / 'YoY') names the output columns.
+    """
+    growth = growth_counts.pct_change(periods=periods, fill_method=None) * 100
+    growth_df = growth[['Residential', 'Commercial']].rename(columns={
+        'Residential': f'Residential sales growth rate ({label})',
+        'Commercial': f'Commercial sales growth rate ({label})'
+    }).reset_index().sort_values('Quarter')
+
+    # Apply filters: Remove the incomplete quarter and outliers
+    growth_df = growth_df[growth_df['Quarter'] != INCOMPLETE_QUARTER]
+    for col in [f'Residential sales growth rate ({label})', f'Commercial sales growth rate ({label})']:
+        if col in growth_df.columns:
+            growth_df.loc[growth_df[col] > MAX_GROWTH_PCT, col] = None
+    return growth_df
+
+
+def growth_indicators(base_counts, growth_counts, quarters):
+    """
+    All growth indicators from pre-counted transactions. Returns a dict with
+    the 'ratio', 'qoq' and 'yoy' chart frames.
+    """
+    growth_counts = growth_counts.copy()
+    # Ensure both columns exist
+    for col in ['Residential', 'Commercial']:
+        if col not in growth_counts.columns:
+            growth_counts[col] = 0
+
+    return {
+        'ratio': offplan_ready_ratio(base_counts, quarters),
+        'qoq': sales_growth(growth_counts, 1, 'QoQ'),
+        'yoy': sales_growth(growth_counts, 4, 'YoY'),
+    }
+
+
+def _as_str(frame, cols):
+    # Plain string keys, so pivots and added columns do not depend on category sets
+    for col in cols:
+        frame[col] = frame[col].astype(str)
+    return frame
+
+
+def growth_indicators_for(cube, selection):
+    """
+    Growth indicators for a geography selection, counted from the
+    pre-aggregated cube instead of the transactions.
+    """
+    base_counts = cube.rollup(['Quarter', 'Asset Type', 'Sale Type'], selection)
+    base_counts = _as_str(base_counts.rename(columns={'transactions': 'count'}), ['Quarter', 'Asset Type', 'Sale Type'])
+    base_counts = base_counts[['Quarter', 'Asset Type', 'Sale Type', 'count']]
+
+    by_asset = _as_str(cube.rollup(['Quarter', 'Asset Type'], selection), ['Quarter', 'Asset Type'])
+    growth_counts = by_asset.pivot(index='Quarter', columns='Asset Type', values='transactions').fillna(0).astype(int)
+    growth_counts.columns.name = 'Asset Type'
+
+    quarters = sorted(cube.rollup('Quarter', selection)['Quarter'].astype(str))
+    return growth_indicators(base_counts, growth_counts, quarters)
+
+
+def popular_selections(cube, top_n=PRECOMPUTE_TOP_DISTRICTS):
+    """
+    (district, community, project, year) keys worth computing at startup:
+    everything, then the districts with the most transactions.
+    """
+    districts = cube.rollup('District', {}).nlargest(top_n, 'transactions')['District']
+    return [("All", "All", "All", "All")] + [(d, "All", "All", "All") for d in districts]
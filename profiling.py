@@ -0,0 +1,143 @@
+import cProfile
+import io
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+# The timer of the run in progress, per thread (Streamlit reruns each session
+# in its own script thread)
+_active = threading.local()
+
+# cProfile records one run at a time: on Python 3.12+ it uses the
+# interpreter-wide sys.monitoring, so a second enabled profiler raises.
+# Profiled runs take turns; _profiling is the RunTimer currently recording.
+_profiling_lock = threading.Lock()
+_profiling = None
+
+
+class RunTimer:
+    """
+    Wall-clock time per named stage of one run (a dashboard rerun or a
+    headless job). Stages nest; each keeps its depth so the report reads as
+    a tree. With profile=True the whole run is also recorded by cProfile.
+
+        timer = RunTimer()
+        with timer:
+            with stage('trend rollup'):
+                ...
+        timer.report()
+    """
+
+    def __init__(self, profile=False):
+        self.stages = []
+        self.total_ms = None
+        self._depth = 0
+        self._profiler = cProfile.Profile() if profile else None
+        # True when profiling was asked for but cProfile was busy
+        self.profile_skipped = False
+        self._thread = None
+
+    def start(self):
+        unfinished = getattr(_active, 'timer', None)
+        if unfinished is not None:
+            # Left by a run that never reached stop(), e.g. one interrupted by
+            # a rerun of the same session: stop it and release its profiler
+            unfinished.stop()
+        _active.timer = self
+        self._thread = threading.current_thread()
+        self._start = time.perf_counter()
+        if self._profiler is not None and not self._claim_profiler():
+            self._profiler = None
+            self.profile_skipped = True
+        return self
+
+    def _claim_profiler(self):
+        global _profiling
+        with _profiling_lock:
+            owner = _profiling
+            if owner is not None and not owner._thread.is_alive():
+                # Left enabled by a run whose thread ended before it stopped
+                owner._profiler.disable()
+                owner = _profiling = None
+            if owner is not None:
+                return False
+            try:
+                self._profiler.enable()
+            except ValueError:
+                # Another profiler or debugger is active in the interpreter
+                return False
+            _profiling = self
+            return True
+
+    def stop(self):
+        global _profiling
+        if self._profiler is not None:
+            self._profiler.disable()
+            with _profiling_lock:
+                if _profiling is self:
+                    _profiling = None
+        self.total_ms = (time.perf_counter() - self._start) * 1000
+        if getattr(_active, 'timer', None) is self:
+            _active.timer = None
+        return self
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    @contextmanager
+    def stage(self, name):
+        # Reserve the slot first so stages are listed in the order they started
+        record = {'Stage': name, 'depth': self._depth, 'ms': None}
+        self.stages.append(record)
+        self._depth += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record['ms'] = (time.perf_counter() - start) * 1000
+            self._depth -= 1
+
+    def report(self):
+        """
+        One row per stage (indented by depth) with its milliseconds and share
+        of the run. Time outside top-level stages is listed as '(other)'.
+        """
+        rows = [{'Stage': '  ' * s['depth'] + s['Stage'], 'ms': s['ms']} for s in self.stages]
+        if self.total_ms is not None:
+            staged = sum(s['ms'] or 0 for s in self.stages if s['depth'] == 0)
+            rows.append({'Stage': '(other)', 'ms': max(self.total_ms - staged, 0.0)})
+        report = pd.DataFrame(rows, columns=['Stage', 'ms'])
+        if self.total_ms:
+            report['% of run'] = report['ms'] / self.total_ms * 100
+        return report
+
+    def profile_stats(self, limit=30, sort='cumulative'):
+        """
+        The top `limit` functions from cProfile as text, None if the run was
+        not profiled.
+        """
+        if self._profiler is None:
+            return None
+        out = io.StringIO()
+        pstats.Stats(self._profiler, stream=out).strip_dirs().sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+
+@contextmanager
+def stage(name):
+    """
+    Time a block as a stage of the active RunTimer; a no-op when no run is
+    being timed, so instrumented code costs nothing elsewhere.
+    """
+    timer = getattr(_active, 'timer', None)
+    if timer is None:
+        yield
+    else:
+        with timer.stage(name):
+            yield
@@ -0,0 +1,181 @@
+import copy
+
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.linalg import lsqr
+
+from data_loader import transaction_keys
+from flips import APPRECIATION_RANGE
+from indicators import INCOMPLETE_QUARTER
+
+SEGMENT_DIMENSIONS = ['District', 'Community', 'Asset Type']
+# Periods backed by fewer pairs than this are left out of the published index
+MIN_PAIRS_PER_PERIOD = 5
+
+
+class RepeatSalesIndex:
+    """
+    Repeat-sales (Bailey-Muth-Nourse / Case-Shiller style) price index per
+    District / Community / Asset Type segment, built on the property pairs
+    found by FlipEngine. Each pair contributes log(P_t / P_s) = b_t - b_s, so
+    the index follows the same properties over time and is not skewed by the
+    mix of communities sold in each quarter.
+
+    Per segment the normal equations X'X, X'y of the sparse pair design
+    matrix are accumulated and solved with sparse least squares (LSQR). The
+    accumulated terms are cached, so new pairs only add to them (see update).
+    """
+
+    def __init__(self, df, flips):
+        self._periods = {}
+        self._cache = {}
+        self._load(df, flips)
+
+    def _load(self, df, flips):
+        self.n_rows = len(df)
+        self._prev = flips.prev
+        # Segment dimensions as integer codes plus a value -> code lookup
+        self._segments = {}
+        for dim in SEGMENT_DIMENSIONS:
+            codes, uniques = pd.factorize(df[dim])
+            self._segments[dim] = (codes, {v: k for k, v in enumerate(uniques)})
+
+        # Periods keep their column in the design matrix across updates
+        codes, quarters = pd.factorize(df['Quarter'].astype(str))
+        for label in sorted(set(quarters) - set(self._periods) - {'NaT'}):
+            self._periods[label] = len(self._periods)
+        self._quarter_col = pd.Index(list(self._periods)).get_indexer(quarters)[codes]
+
+        # Usable pairs: market-rate sales on both sides, in different quarters,
+        # with appreciation inside the outlier range
+        low, high = APPRECIATION_RANGE
+        has_prev = flips.prev >= 0
+        prev = np.where(has_prev, flips.prev, 0)
+        q_cur, q_prev = self._quarter_col, self._quarter_col[prev]
+        usable = (has_prev & flips.market_rate & (flips.days_since_last > 0)
+                  & (flips.appreciation > low) & (flips.appreciation < high)
+                  & (q_cur >= 0) & (q_prev >= 0) & (q_cur != q_prev))
+        self._pair_rows = np.flatnonzero(usable)
+        self._log_return = np.log1p(flips.appreciation[self._pair_rows])
+        # Pairs are identified by the transaction keys of their two sales, which
+        # survive the row moves of a cache compaction or rebuild (see update)
+        keys = transaction_keys(df)
+        self._pair_ids = pd.util.hash_pandas_object(pd.DataFrame({
+            'sale': keys[self._pair_rows], 'previous': keys[self._prev[self._pair_rows]],
+        }), index=False).to_numpy()
+
+    def _pair_mask(self, segment, rows, segments=None):
+        segments = self._segments if segments is None else segments
+        mask = np.ones(len(rows), dtype=bool)
+        for dim, value in zip(SEGMENT_DIMENSIONS, segment):
+            if value != "All":
+                codes, lookup = segments[dim]
+                mask &= codes[rows] == lookup.get(value, -2)
+        return mask
+
+    def _normal_equations(self, rows, log_return):
+        n_periods = len(self._periods)
+        cur = self._quarter_col[rows]
+        prev = self._quarter_col[self._prev[rows]]
+        m = len(rows)
+        design = csr_matrix(
+            (np.r_[np.ones(m), -np.ones(m)], (np.r_[np.arange(m), np.arange(m)], np.r_[cur, prev])),
+            shape=(m, n_periods),
+        )
+        xtx = (design.T @ design).tocsr()
+        xty = design.T @ log_return
+        counts = np.bincount(np.r_[cur, prev], minlength=n_periods)
+        return xtx, xty, counts
+
+    def _terms(self, segment):
+        if segment not in self._cache:
+            mask = self._pair_mask(segment, self._pair_rows)
+            self._cache[segment] = {'terms': self._normal_equations(self._pair_rows[mask], self._log_return[mask])}
+        return self._cache[segment]
+
+    def index(self, district="All", community="All", asset_type="All"):
+        """
+        Quarterly index (first traded quarter = 100) for a segment, with the
+        number of pairs touching each quarter.
+        """
+        entry = self._terms((district, community, asset_type))
+        if 'result' in entry:
+            return entry['result']
+
+        xtx, xty, counts = entry['terms']
+        observed = np.flatnonzero(counts > 0)
+        labels = np.array(sorted(self._periods, key=self._periods.get))
+        if len(observed) < 2:
+            result = pd.DataFrame(columns=['Quarter', 'Repeat-Sales Index', 'pairs'])
+        else:
+            # Order periods chronologically and fix the first one as the base (b = 0)
+            observed = observed[np.argsort(labels[observed])]
+            free = observed[1:]
+            beta = lsqr(xtx[free][:, free], xty[free], atol=1e-10, btol=1e-10)[0]
+            result = pd.DataFrame({
+                'Quarter': labels[observed],
+                'Repeat-Sales Index': 100 * np.exp(np.r_[0.0, beta]),
+                'pairs': counts[observed],
+            })
+            # Thinly traded quarters stay in the regression but are not published
+            result = result[(result['pairs'] >= MIN_PAIRS_PER_PERIOD) & (result['Quarter'] != INCOMPLETE_QUARTER)]
+            result = result.reset_index(drop=True)
+        entry['result'] = result
+        return result
+
+    def update(self, df, flips):
+        """
+        Refresh for a changed dataset and its FlipEngine. Old and new pairs
+        are matched on the transaction keys of both sales, so rows may have
+        moved since the last load. Cached segments only add the normal
+        equation terms of the new pairs. A segment that lost a pair is
+        rebuilt from scratch: a late sale that falls between two cached
+        sales of a property replaces their pair, for example.
+        """
+        old_segments, old_rows, old_ids = self._segments, self._pair_rows, self._pair_ids
+        old_periods = len(self._periods)
+        self._load(df, flips)
+        n_periods = len(self._periods)
+
+        removed = old_rows[_unmatched(old_ids, self._pair_ids)]
+        added = _unmatched(self._pair_ids, old_ids)
+        new_pairs, new_log_return = self._pair_rows[added], self._log_return[added]
+
+        for segment, entry in list(self._cache.items()):
+            if len(removed) and self._pair_mask(segment, removed, old_segments).any():
+                del self._cache[segment]
+                continue
+            mask = self._pair_mask(segment, new_pairs)
+            xtx, xty, counts = entry['terms']
+            if n_periods != old_periods:
+                xtx = xtx.copy()
+                xtx.resize((n_periods, n_periods))
+                xty = np.r_[xty, np.zeros(n_periods - old_periods)]
+                counts = np.r_[counts, np.zeros(n_periods - old_periods, dtype=counts.dtype)]
+            if mask.any():
+                d_xtx, d_xty, d_counts = self._normal_equations(new_pairs[mask], new_log_return[mask])
+                xtx, xty, counts = xtx + d_xtx, xty + d_xty, counts + d_counts
+            self._cache[segment] = {'terms': (xtx, xty, counts)}
+
+    def updated(self, df, flips):
+        """
+        A copy of this index brought up to date with update(), leaving this
+        one unchanged for the sessions still using it.
+        """
+        new = copy.copy(self)
+        new._periods = dict(self._periods)
+        new._cache = dict(self._cache)
+        new.update(df, flips)
+        return new
+
+
+def _unmatched(ids, other):
+    """
+    Mask of the ids with no counterpart in other, matched by multiplicity
+    like data_loader._drop_known.
+    """
+    other = np.sort(other)
+    known = np.searchsorted(other, ids, side='right') - np.searchsorted(other, ids, side='left')
+    copy_number = pd.Series(ids).groupby(ids).cumcount().to_numpy()
+    return copy_number >= known
@@ -0,0 +1,18 @@
+"""
+The cleaned dataset is loaded once per server process and shared by every
+session (st.cache_resource). It must be treated as read-only: columns read
+from the cache are views of the memory-mapped Arrow file, and a change made
+by one session would show up in all of them.
+
+Sessions select rows by position through the shared filter index and the
+views aggregate them into small per-selection frames, so no session copies
+or adds columns to the shared frame.
+"""
+
+
+def frame_nbytes(df):
+    """
+    Bytes held by the columns of df (categories counted once, strings deep).
+    """
+    return int(df.memory_usage(index=False, deep=True).sum())
+
@@ -0,0 +1,285 @@
+"""
+Optional DuckDB backend for the dashboard analytics. The cleaned
+transactions are stored once in a local DuckDB database file, and the
+filter cascade, trend and area roll-ups, growth indicator counts and flip
+statistics run as SQL against it. One connection is shared by every
+session of the process; DuckDB spills to disk beyond MEMORY_LIMIT, so large
+queries run out of core.
+
+Each version of the cleaned data gets its own database file, named after
+the loader's cache key (see database_path), built once and then opened
+read-only. DuckDB lets one process write a file but many read it, so
+several server processes can share the database.
+"""
+import hashlib
+import os
+import threading
+
+import numpy as np
+import pandas as pd
+
+try:
+    import duckdb
+except ImportError:  # optional dependency
+    duckdb = None
+
+from analytics import DashboardAnalytics
+from cube import MEASURES
+from data_loader import transaction_keys
+from flips import (APPRECIATION_RANGE, DEFAULT_HOLDING_WINDOW, MIN_MARKET_PRICE,
+                   PROPERTY_COLS, FlipEngine, can_detect_flips)
+from indicators import INCOMPLETE_QUARTER
+from profiling import stage
+from repeat_sales import RepeatSalesIndex
+
+HAS_DUCKDB = duckdb is not None
+# Bumped when the table layout changes, so older database files are rebuilt
+SCHEMA_VERSION = 1
+# Working memory per process before DuckDB spills to its temp directory
+MEMORY_LIMIT = '2GB'
+# Per-transaction flip columns added to the sales table (see FlipEngine)
+FLIP_COLUMNS = ['days_since_last', 'appreciation', 'market_rate', 'prev_same_year', 'is_resale']
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _fingerprint(df):
+    # Changes whenever a transaction is added, removed or cleaned differently
+    return hashlib.sha1(transaction_keys(df).tobytes()).hexdigest()
+
+
+def _where(selection, extra=()):
+    """
+    WHERE clause and parameters for a filter spec ("All" values ignored),
+    plus any extra conditions.
+    """
+    conditions, params = list(extra), []
+    for dim, value in sorted(selection.items()):
+        if value != "All":
+            conditions.append(f'{_quote(dim)} = ?')
+            params.append(value)
+    return (' WHERE ' + ' AND '.join(conditions) if conditions else ''), params
+
+
+def _flip_columns_sql(columns):
+    """
+    SELECT expressions pairing every transaction with the previous sale of
+    the same property, as FlipEngine does: properties are PROPERTY_COLS
+    with no missing value, ordered by Registration (missing last) then by
+    row order.
+    """
+    props = [_quote(c) for c in PROPERTY_COLS if c in columns]
+    window = f"(PARTITION BY {', '.join(props)} ORDER BY Registration NULLS LAST, row_id)"
+    keyed = ' AND '.join(f'{p} IS NOT NULL' for p in props)
+    has_prev = f"({keyed} AND lag(row_id) OVER {window} IS NOT NULL)"
+    prev_price = f'lag("Price (AED)") OVER {window}'
+    prev_reg = f'lag(Registration) OVER {window}'
+    prev_year = f'lag(Year) OVER {window}' if 'Year' in columns else 'NULL'
+    year = 'Year' if 'Year' in columns else 'NULL'
+    return [
+        f"CASE WHEN {has_prev} THEN CAST(floor((epoch(Registration) - epoch({prev_reg})) / 86400) AS FLOAT) END AS days_since_last",
+        f'CASE WHEN {has_prev} AND {prev_price} <> 0 THEN ("Price (AED)" - {prev_price}) / {prev_price} END AS appreciation',
+        f'coalesce({has_prev} AND "Price (AED)" > {MIN_MARKET_PRICE} AND {prev_price} > {MIN_MARKET_PRICE}, false) AS market_rate',
+        f"coalesce({has_prev} AND {year} = {prev_year}, false) AS prev_same_year",
+        "coalesce(Sequence = 'Secondary', false) AS is_resale",
+    ]
+
+
+def build_database(con, df):
+    """
+    (Re)create the sales table from the cleaned frame: categoricals as
+    VARCHAR, a Month column for monthly trends, the original row order as
+    row_id and, when flips can be detected, the FlipEngine columns.
+    """
+    frame = df.assign(row_id=np.arange(len(df), dtype=np.int64))
+    con.register('cleaned', frame)
+    cols = []
+    for col in df.columns:
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            cols.append(f'CAST({_quote(col)} AS VARCHAR) AS {_quote(col)}')
+        else:
+            cols.append(_quote(col))
+    cols += ["strftime(Registration, '%Y-%m') AS Month", 'row_id']
+    if can_detect_flips(df):
+        cols += _flip_columns_sql(df.columns)
+    con.execute('DROP TABLE IF EXISTS sales')
+    con.execute(f"CREATE TABLE sales AS SELECT {', '.join(cols)} FROM cleaned")
+    con.unregister('cleaned')
+
+
+def database_path(directory, key):
+    """
+    Database file in directory for the cleaned data identified by key.
+    """
+    digest = hashlib.sha1(f'{SCHEMA_VERSION}:{key}'.encode()).hexdigest()[:16]
+    return os.path.join(directory, f'sales.{digest}.duckdb')
+
+
+def _build_file(db_path, df):
+    """
+    Build the database for df under a temporary name and move it into
+    place, so readers never see a partial file and concurrent builders do
+    not need the same file's write lock. Files for other data are removed.
+    """
+    directory = os.path.dirname(os.path.abspath(db_path))
+    os.makedirs(directory, exist_ok=True)
+    tmp_path = f'{db_path}.{os.getpid()}.build'
+    con = duckdb.connect(tmp_path)
+    try:
+        build_database(con, df)
+        con.close()
+        os.replace(tmp_path, db_path)
+    except BaseException:
+        con.close()
+        for path in (tmp_path, tmp_path + '.wal'):
+            if os.path.exists(path):
+                os.remove(path)
+        raise
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if name.startswith('sales.') and name.endswith('.duckdb') and path != os.path.abspath(db_path):
+            try:
+                os.remove(path)
+            except OSError:
+                # Still open in another process (Windows); removed by a later build
+                pass
+
+
+class SQLCube:
+    """
+    The AggregateCube interface (rollup, top, totals) answered by
+    aggregating the sales table, so growth_indicators_for and
+    popular_selections work unchanged on the SQL backend.
+    """
+
+    def __init__(self, backend):
+        self._backend = backend
+
+    def rollup(self, by, selection):
+        by = [by] if isinstance(by, str) else list(by)
+        keys = ', '.join(_quote(b) for b in by)
+        means = ', '.join(f'avg(CAST({_quote(m)} AS DOUBLE)) AS {_quote(m)}' for m in MEASURES)
+        where, params = _where(selection, [f'{_quote(b)} IS NOT NULL' for b in by])
+        return self._backend.query(
+            f'SELECT {keys}, count(*) AS transactions, {means} FROM sales{where} GROUP BY {keys} ORDER BY {keys}', params)
+
+    def top(self, by, measure, selection, n=10):
+        where, params = _where(selection, [f'{_quote(by)} IS NOT NULL'])
+        return self._backend.query(
+            f'SELECT {_quote(by)}, avg(CAST({_quote(measure)} AS DOUBLE)) AS {_quote(measure)} FROM sales{where} '
+            f'GROUP BY {_quote(by)} ORDER BY {_quote(measure)} DESC NULLS LAST, {_quote(by)} LIMIT {int(n)}', params)
+
+    def totals(self, selection):
+        where, params = _where(selection)
+        dated = 'count(Year)' if 'Year' in self._backend.columns else '0'
+        means = ', '.join(f'avg(CAST({_quote(m)} AS DOUBLE))' for m in MEASURES)
+        row = self._backend.query(f'SELECT count(*), {dated}, {means} FROM sales{where}', params).iloc[0]
+        totals = {'transactions': int(row.iloc[0]), 'dated': int(row.iloc[1])}
+        for k, measure in enumerate(MEASURES):
+            value = row.iloc[2 + k]
+            totals[measure] = np.nan if pd.isna(value) else float(value)
+        return totals
+
+
+class DuckDBAnalytics(DashboardAnalytics):
+    """
+    DashboardAnalytics on a DuckDB database file instead of in-memory
+    pandas structures. The repeat-sales index still needs the FlipEngine
+    arrays, so it is built from the pandas frame on its first use.
+    """
+
+    def __init__(self, df, directory, key=None, load=None, memory_limit=MEMORY_LIMIT):
+        """
+        df is the cleaned frame; the database is built from it when directory
+        has no file for its key yet. key identifies the cleaned data (see
+        data_loader.cache_key); without one the transactions are hashed.
+        With load, a function returning the frame again for the repeat-sales
+        index, df is not kept.
+        """
+        if duckdb is None:
+            raise ImportError("The DuckDB backend needs the 'duckdb' package (pip install duckdb).")
+        self.db_path = database_path(directory, key if key is not None else _fingerprint(df))
+        if not os.path.exists(self.db_path):
+            with stage('database build'):
+                _build_file(self.db_path, df)
+        # Read-only connections take a shared lock, so every server process
+        # can open the same file; a rebuild writes a new file instead
+        self._con = duckdb.connect(self.db_path, read_only=True)
+        self._con.execute(f"SET memory_limit = '{memory_limit}'")
+        self._con.execute('SET temp_directory = ?', [f'{self.db_path}.{os.getpid()}.tmp'])
+        self._con.execute('SET preserve_insertion_order = false')
+
+        self.columns = [r[0] for r in self._con.execute('DESCRIBE sales').fetchall()]
+        self.n_rows = self._con.execute('SELECT count(*) FROM sales').fetchone()[0]
+        self.cube = SQLCube(self)
+        self.has_flips = all(c in self.columns for c in FLIP_COLUMNS)
+        self._df = df if load is None else None
+        self._load = load
+        self._flips = None
+        self._repeat_sales = None
+        self._lock = threading.Lock()
+
+    def query(self, sql, params=()):
+        """
+        Run sql on a cursor of the shared connection (one per call, so
+        sessions can query concurrently) and return a DataFrame.
+        """
+        return self._con.cursor().execute(sql, list(params)).df()
+
+    @property
+    def df(self):
+        if self._load is None:
+            return self._df
+        with stage('load transactions'):
+            return self._load()
+
+    @property
+    def repeat_sales(self):
+        # The flip engine is only needed here (flip_stats runs in SQL), so
+        # both are built from one load of the frame, which is then released
+        with self._lock:
+            if self._repeat_sales is None:
+                df = self.df
+                with stage('flip engine build'):
+                    self._flips = FlipEngine(df)
+                with stage('repeat-sales index build'):
+                    self._repeat_sales = RepeatSalesIndex(df, self._flips)
+        return self._repeat_sales
+
+    def options(self, dim, spec):
+        where, params = _where(spec, [f'{_quote(dim)} IS NOT NULL'])
+        values = self.query(f'SELECT DISTINCT {_quote(dim)} FROM sales{where} ORDER BY 1', params).iloc[:, 0]
+        return [v.item() if isinstance(v, np.generic) else v for v in values]
+
+    def select(self, spec):
+        with stage('filter rows'):
+            where, params = _where(spec)
+            extra = ['Month', 'row_id'] + FLIP_COLUMNS
+            frame = self.query(f'SELECT * FROM sales{where} ORDER BY row_id', params)
+            return frame.drop(columns=[c for c in extra if c in frame.columns])
+
+    def flip_stats(self, spec, window_days=DEFAULT_HOLDING_WINDOW):
+        """
+        Quarterly flip rate and flip appreciation (see FlipEngine.stats),
+        aggregated in SQL from the precomputed flip columns.
+        """
+        with stage('flip stats'):
+            low, high = APPRECIATION_RANGE
+            days = 'days_since_last'
+            if spec.get('Year', "All") != "All":
+                days = 'CASE WHEN prev_same_year THEN days_since_last END'
+            is_flip = f'coalesce(is_resale AND {days} > 0 AND {days} <= {float(window_days)}, false)'
+            kept = f'{is_flip} AND market_rate AND appreciation > {low} AND appreciation < {high}'
+            where, params = _where(spec, ['Quarter IS NOT NULL', 'Quarter <> ?'])
+            stats = self.query(
+                f'SELECT Quarter, sum(CAST(is_resale AS BIGINT)) AS total_resales, sum(CAST({is_flip} AS BIGINT)) AS flips, '
+                f'avg(CASE WHEN {kept} THEN appreciation END) AS appreciation '
+                f'FROM sales{where} GROUP BY Quarter ORDER BY Quarter', [INCOMPLETE_QUARTER] + params)
+
+        flip_df = stats[['Quarter', 'total_resales', 'flips']].astype({'total_resales': 'int64', 'flips': 'int64'})
+        flip_df['Flip Rate (%)'] = (flip_df['flips'] / flip_df['total_resales'].replace(0, 1)) * 100
+        apprec_df = stats.loc[stats['appreciation'].notna(), ['Quarter', 'appreciation']].reset_index(drop=True)
+        apprec_df['Flip Price Appreciation (%)'] = apprec_df['appreciation'] * 100
+        return flip_df, apprec_df
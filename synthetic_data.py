@@ -0,0 +1,212 @@
+"""
+Synthetic sales data in the same format as recent_sales.txt, for running and
+benchmarking the dashboard without the private export.
+
+The generator models units (apartments, villas, offices, plots) inside a
+District -> Community -> Project hierarchy. Every transaction sells one
+unit: its first sale is 'Primary', later ones 'Secondary', and a share of
+resales happen within a few months of the previous sale (flips). Prices
+follow a per-district market trend. Values are written as the export
+formats them ('AED 1,250,000', '85.50 sqm', '14,706 AED/sqm', '50%',
+dd/mm/yyyy) with '-' placeholders.
+
+Usage:
+    python synthetic_data.py --rows 1000000 --out synthetic_sales.txt
+    python synthetic_data.py --rows 20000000 --shards 8 --out sales_shards/
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+START = pd.Timestamp('2019-01-01')
+END = pd.Timestamp('2026-03-31')
+CHUNK_ROWS = 500_000
+
+# Hierarchy size: districts, communities per district, projects per community
+N_DISTRICTS = 12
+COMMUNITIES_PER_DISTRICT = 12
+PROJECTS_PER_COMMUNITY = 15
+# Distinct units per transaction; lower means more repeat sales
+UNITS_PER_ROW = 0.6
+# Share of transactions that resell a unit sold in the last FLIP_DAYS days
+FLIP_SHARE = 0.04
+FLIP_DAYS = 180
+
+PROPERTY_TYPES = {
+    'Residential': ['Apartment', 'Villa', 'Townhouse'],
+    'Commercial': ['Office', 'Retail', 'Land'],
+}
+LAYOUTS = ['Studio', '1 Bed', '2 Beds', '3 Beds', '4 Beds', '5 Beds']
+
+
+def _unit_hash(ids, salt):
+    """
+    Deterministic uniform [0, 1) values per unit id (splitmix64), so unit
+    attributes need no per-unit storage even at tens of millions of units.
+    """
+    with np.errstate(over='ignore'):
+        x = ids.astype(np.uint64) + np.uint64(salt) * np.uint64(0x9E3779B97F4A7C15)
+        x = (x ^ (x >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        x = (x ^ (x >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        x = x ^ (x >> np.uint64(31))
+    return (x >> np.uint64(11)).astype(np.float64) / float(1 << 53)
+
+
+def _units(unit_ids):
+    """
+    Fixed attributes of each unit, derived from its id.
+    """
+    n_projects = N_DISTRICTS * COMMUNITIES_PER_DISTRICT * PROJECTS_PER_COMMUNITY
+    # Popular projects get more units (Zipf-like)
+    project = np.minimum((n_projects * _unit_hash(unit_ids, 1) ** 2).astype(np.int64), n_projects - 1)
+    community = project // PROJECTS_PER_COMMUNITY
+    district = community // COMMUNITIES_PER_DISTRICT
+
+    commercial = _unit_hash(unit_ids, 2) < 0.15
+    kind = (_unit_hash(unit_ids, 3) * 3).astype(np.int64)
+    residential_types = np.array(PROPERTY_TYPES['Residential'])
+    commercial_types = np.array(PROPERTY_TYPES['Commercial'])
+    property_type = np.where(commercial, commercial_types[kind], residential_types[kind])
+
+    bedrooms = np.minimum((_unit_hash(unit_ids, 4) * 4 + (kind > 0) * 2).astype(np.int64), len(LAYOUTS) - 1)
+    layout = np.where(commercial, '-', np.array(LAYOUTS)[bedrooms])
+
+    sold_area = np.round(35 + bedrooms * 45 * (0.8 + 0.4 * _unit_hash(unit_ids, 5)) + commercial * 60, 2)
+    is_land = property_type == 'Land'
+    is_apartment = np.isin(property_type, ['Apartment', 'Office', 'Retail'])
+    plot_area = np.round(sold_area * (1.5 + _unit_hash(unit_ids, 6)), 2)
+
+    # Base AED/sqm per district plus a unit quality factor
+    district_rate = 6000 + 1000 * (district % 7)
+    quality = 0.7 + 0.6 * _unit_hash(unit_ids, 7)
+    return {
+        'District': district, 'Community': community, 'Project': project,
+        'Asset Type': np.where(commercial, 'Commercial', 'Residential'),
+        'Property Type': property_type, 'Layout': layout,
+        'sold_area': np.where(is_land, np.nan, sold_area),
+        'plot_area': np.where(is_apartment, np.nan, plot_area),
+        'base_rate': district_rate * quality,
+    }
+
+
+def _format_number(values, template):
+    return [template.format(v) if v == v else '-' for v in values]
+
+
+def generate_chunks(rows, seed=0, start=START, end=END, chunk_rows=CHUNK_ROWS):
+    """
+    Yield raw sales frames (string columns as in the export) of up to
+    chunk_rows rows, in registration order.
+    """
+    rng = np.random.default_rng(seed)
+    n_units = max(1, int(rows * UNITS_PER_ROW))
+    seen = np.zeros(n_units, dtype=bool)
+    span_days = (end - start).days
+    # Sales of the last FLIP_DAYS days before this chunk, to draw flips from
+    carry_days = np.empty(0, dtype=np.int64)
+    carry_units = np.empty(0, dtype=np.int64)
+
+    for offset in range(0, rows, chunk_rows):
+        n = min(chunk_rows, rows - offset)
+        # Registration days for this slice of the timeline
+        lo = span_days * offset // rows
+        hi = max(lo + 1, span_days * (offset + n) // rows)
+        day = np.sort(rng.integers(lo, hi, n))
+        unit = rng.integers(0, n_units, n)
+
+        # Flips resell the unit of an earlier sale at most FLIP_DAYS before
+        pool_days = np.r_[carry_days, day]
+        pool_units = np.r_[carry_units, unit]
+        earliest = np.searchsorted(pool_days, day - FLIP_DAYS)
+        latest = len(carry_days) + np.arange(n)
+        flip = (rng.random(n) < FLIP_SHARE) & (latest > earliest)
+        pick = earliest + (rng.random(n) * (latest - earliest)).astype(np.int64)
+        unit[flip] = pool_units[pick[flip]]
+
+        # First sale of a unit is Primary, later ones Secondary
+        _, first_in_chunk = np.unique(unit, return_index=True)
+        primary = np.zeros(n, dtype=bool)
+        primary[first_in_chunk] = ~seen[unit[first_in_chunk]]
+        seen[unit] = True
+
+        recent = pool_days >= hi - FLIP_DAYS
+        carry_days = np.r_[carry_days, day][recent]
+        carry_units = np.r_[carry_units, unit][recent]
+
+        attrs = _units(unit)
+        reg = start + pd.to_timedelta(day, unit='D')
+        district = attrs['District']
+
+        # Market trend: each district grows at its own rate, with noise per sale
+        years = day / 365.25
+        trend = np.exp((0.02 + 0.015 * (district % 5)) * years + rng.normal(0, 0.08, n))
+        off_plan = primary & (rng.random(n) < 0.7)
+        rate = attrs['base_rate'] * trend * np.where(off_plan, 0.9, 1.0)
+
+        share = np.where(rng.random(n) < 0.06, 0.5, 1.0)
+        area = np.where(np.isnan(attrs['sold_area']), attrs['plot_area'], attrs['sold_area'])
+        price = np.round(rate * area * share, -3)
+
+        # Placeholders as they appear in the export
+        rate_text = np.where(rng.random(n) < 0.15, np.nan, rate)
+        price = np.where(rng.random(n) < 0.001, np.nan, price)
+        share_text = np.where(share < 1, '50%', np.where(rng.random(n) < 0.05, '-', '100%'))
+
+        yield pd.DataFrame({
+            'District': [f'District {d}' for d in district],
+            'Community': [f'Community {c}' for c in attrs['Community']],
+            'Project': [f'Project {p}' for p in attrs['Project']],
+            'Asset Type': attrs['Asset Type'],
+            'Property Type': attrs['Property Type'],
+            'Sale Type': np.where(off_plan, 'Off-plan', 'Ready'),
+            'Sequence': np.where(primary, 'Primary', 'Secondary'),
+            'Layout': attrs['Layout'],
+            'Share': share_text,
+            'Price (AED)': _format_number(price, 'AED {:,.0f}'),
+            'Sold Area (sqm)': _format_number(attrs['sold_area'], '{:,.2f} sqm'),
+            'Plot Area (sqm)': _format_number(attrs['plot_area'], '{:,.2f} sqm'),
+            'Rate (AED/sqm)': _format_number(rate_text, '{:,.0f} AED/sqm'),
+            'Registration': reg.strftime('%d/%m/%Y'),
+        })
+
+
+def write_sales(out, rows, seed=0, shards=1, chunk_rows=CHUNK_ROWS):
+    """
+    Write `rows` synthetic transactions to the file `out`, or split them into
+    `shards` chronological files inside the directory `out`. Returns the paths.
+    """
+    if shards > 1:
+        os.makedirs(out, exist_ok=True)
+        per_shard = -(-rows // shards)
+        paths = [os.path.join(out, f'sales_{i:03d}.csv') for i in range(shards)]
+    else:
+        per_shard = rows
+        paths = [out]
+
+    shard, written = 0, 0
+    for chunk in generate_chunks(rows, seed, chunk_rows=min(chunk_rows, per_shard)):
+        while len(chunk):
+            room = per_shard - written
+            part, chunk = chunk.iloc[:room], chunk.iloc[room:]
+            part.to_csv(paths[shard], mode='a' if written else 'w', header=not written, index=False)
+            written += len(part)
+            if written == per_shard:
+                shard, written = shard + 1, 0
+    return paths[:shard + (written > 0)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate synthetic sales data in the recent_sales.txt format.")
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--out', default='synthetic_sales.txt')
+    parser.add_argument('--shards', type=int, default=1)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    paths = write_sales(args.out, args.rows, args.seed, args.shards)
+    print(f"Wrote {args.rows:,} rows to {len(paths)} file(s): {', '.join(paths[:3])}{' ...' if len(paths) > 3 else ''}")
+
+
+if __name__ == "__main__":
+    main()
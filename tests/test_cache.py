@@ -0,0 +1,244 @@
+"""
+Columnar cache: invalidation when the source changes, and incremental
+ingest of appended rows and delta files.
+"""
+import os
+
+import pandas as pd
+import pyarrow.feather
+import pytest
+
+import data_loader
+from data_loader import ingest, load_data, read_cache
+from synthetic_data import write_sales
+
+ROWS = 3_000
+
+
+@pytest.fixture
+def sales(tmp_path):
+    path = str(tmp_path / 'sales.csv')
+    write_sales(path, ROWS)
+    return path
+
+
+def fresh(path):
+    df, error = load_data(path, use_cache=False)
+    assert error is None
+    return df
+
+
+def lines(path):
+    with open(path) as f:
+        return f.readlines()
+
+
+def test_cache_round_trip(sales):
+    assert read_cache(sales) is None
+    df, error = ingest(sales)
+    assert error is None
+    cached = read_cache(sales)
+    assert cached is not None
+    pd.testing.assert_frame_equal(cached, fresh(sales))
+    pd.testing.assert_frame_equal(df, cached)
+
+
+def test_streamed_rebuild_with_a_column_missing_at_the_start(sales, monkeypatch):
+    # Streamed in chunks of 1000 rows; Layout is blank for the whole first
+    # chunk, so its dictionary starts out empty
+    monkeypatch.setattr(data_loader, 'SAMPLE_ROWS', 500)
+    raw = pd.read_csv(sales, dtype=str, keep_default_na=False)
+    raw.loc[:ROWS // 2, 'Layout'] = ''
+    raw.to_csv(sales, index=False)
+    df, error = load_data(sales, memory_mb=0.01)
+    assert error is None
+    assert read_cache(sales) is not None
+    pd.testing.assert_frame_equal(df, fresh(sales))
+    pd.testing.assert_frame_equal(read_cache(sales), df)
+
+
+def test_streamed_part_is_stored_sorted(sales, monkeypatch):
+    monkeypatch.setattr(data_loader, 'SAMPLE_ROWS', 500)
+    df, error = load_data(sales, memory_mb=0.01)
+    assert error is None
+    meta = data_loader._read_meta(sales)
+    data_path = data_loader._part_paths(sales, meta['parts'][0])[0]
+    table = pyarrow.feather.read_table(data_path)
+    # One record batch, dictionaries already in compact_frame's order, and
+    # no streaming leftovers next to the part
+    assert all(column.num_chunks == 1 for column in table.columns)
+    for name in ['District', 'Community', 'Layout']:
+        categories = table.column(name).chunk(0).dictionary.to_pylist()
+        assert categories == sorted(categories) == df[name].cat.categories.tolist()
+    assert not [f for f in os.listdir(os.path.dirname(data_path)) if '.stream' in f]
+
+
+def test_edited_source_invalidates_cache(sales):
+    ingest(sales)
+    rows = lines(sales)
+    # Same size, different price
+    start = rows[1].index('AED ') + 4
+    digit = '2' if rows[1][start] == '1' else '1'
+    rows[1] = rows[1][:start] + digit + rows[1][start + 1:]
+    with open(sales, 'w') as f:
+        f.writelines(rows)
+    assert read_cache(sales) is None
+    df, error = ingest(sales)
+    assert error is None
+    pd.testing.assert_frame_equal(df, fresh(sales))
+
+
+def test_touched_source_keeps_cache(sales):
+    ingest(sales)
+    stat = os.stat(sales)
+    os.utime(sales, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    assert read_cache(sales) is not None
+
+
+def test_appended_rows_are_ingested(sales, tmp_path):
+    rows = lines(sales)
+    head, tail = rows[:-500], rows[-500:]
+    with open(sales, 'w') as f:
+        f.writelines(head)
+    ingest(sales)
+    with open(sales, 'a') as f:
+        f.writelines(tail)
+    df, error = ingest(sales)
+    assert error is None
+    assert len(df) == ROWS
+    pd.testing.assert_frame_equal(df, fresh(sales))
+
+
+def test_delta_files_are_ingested_once(sales, tmp_path):
+    rows = lines(sales)
+    with open(sales, 'w') as f:
+        f.writelines(rows[:-500])
+    delta = str(tmp_path / 'delta.csv')
+    with open(delta, 'w') as f:
+        f.writelines([rows[0]] + rows[-500:])
+    df, error = ingest(sales, [delta])
+    assert error is None
+    assert len(df) == ROWS
+    again, _ = ingest(sales, [delta])
+    assert len(again) == ROWS
+
+
+def test_identical_sales_are_kept_like_a_rebuild(sales):
+    ingest(sales)
+    rows = lines(sales)
+    with open(sales, 'a') as f:
+        # Two identical sales of a unit already in the file
+        f.writelines([rows[-1], rows[-1]])
+    df, error = ingest(sales)
+    assert error is None
+    assert len(df) == ROWS + 2 == len(fresh(sales))
+
+
+def test_delta_rows_match_by_count(sales, tmp_path):
+    rows = lines(sales)
+    ingest(sales)
+    delta = str(tmp_path / 'delta.csv')
+    with open(delta, 'w') as f:
+        # rows[1] is cached once: one copy is skipped, the other two are new
+        f.writelines([rows[0], rows[1], rows[1], rows[1]])
+    df, error = ingest(sales, [delta])
+    assert error is None
+    assert len(df) == ROWS + 2
+
+
+def test_appended_rows_already_ingested_from_a_delta(sales, tmp_path):
+    rows = lines(sales)
+    with open(sales, 'w') as f:
+        f.writelines(rows[:-500])
+    delta = str(tmp_path / 'delta.csv')
+    with open(delta, 'w') as f:
+        f.writelines([rows[0]] + rows[-500:])
+    ingest(sales, [delta])
+    with open(sales, 'a') as f:
+        f.writelines(rows[-500:])
+    incremental, _ = ingest(sales, [delta])
+    assert len(incremental) == ROWS
+
+    rebuilt_path = str(tmp_path / 'rebuilt' / 'sales.csv')
+    os.makedirs(os.path.dirname(rebuilt_path))
+    with open(rebuilt_path, 'w') as f:
+        f.writelines(rows)
+    rebuilt, _ = ingest(rebuilt_path, [delta])
+    assert len(rebuilt) == ROWS
+
+
+def test_compaction_keeps_delta_rows_apart(sales, tmp_path, monkeypatch):
+    import data_loader
+    monkeypatch.setattr(data_loader, 'MAX_CACHE_PARTS', 1)
+    rows = lines(sales)
+    with open(sales, 'w') as f:
+        f.writelines(rows[:-500])
+    delta = str(tmp_path / 'delta.csv')
+    with open(delta, 'w') as f:
+        f.writelines([rows[0]] + rows[-500:])
+    df, _ = ingest(sales, [delta])
+    assert len(df) == ROWS
+    with open(sales, 'a') as f:
+        f.writelines(rows[-500:])
+    df, _ = ingest(sales, [delta])
+    assert len(df) == ROWS
+
+
+def rebuilt(tmp_path, rows, delta_paths):
+    path = str(tmp_path / 'rebuilt' / 'sales.csv')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.writelines(rows)
+    df, error = ingest(path, delta_paths)
+    assert error is None
+    return df
+
+
+def test_edited_delta_replaces_its_rows(sales, tmp_path):
+    rows = lines(sales)
+    with open(sales, 'w') as f:
+        f.writelines(rows[:-10])
+    delta = str(tmp_path / 'delta.csv')
+    with open(delta, 'w') as f:
+        f.writelines([rows[0]] + rows[-10:])
+    df, _ = ingest(sales, [delta])
+    assert len(df) == ROWS
+
+    # Correct one price in the delta
+    start = rows[-1].index('AED ') + 4
+    digit = '2' if rows[-1][start] == '1' else '1'
+    with open(delta, 'w') as f:
+        f.writelines([rows[0]] + rows[-10:-1] + [rows[-1][:start] + digit + rows[-1][start + 1:]])
+    df, error = ingest(sales, [delta])
+    assert error is None
+    assert len(df) == ROWS
+    pd.testing.assert_frame_equal(df, rebuilt(tmp_path, rows[:-10], [delta]))
+
+
+def test_removed_delta_drops_its_rows(sales, tmp_path):
+    rows = lines(sales)
+    with open(sales, 'w') as f:
+        f.writelines(rows[:-10])
+    delta = str(tmp_path / 'delta.csv')
+    with open(delta, 'w') as f:
+        f.writelines([rows[0]] + rows[-10:])
+    ingest(sales, [delta])
+    df, error = ingest(sales, [])
+    assert error is None
+    assert len(df) == ROWS - 10
+    pd.testing.assert_frame_equal(df, fresh(sales))
+
+
+def test_touched_delta_keeps_cache(sales, tmp_path):
+    rows = lines(sales)
+    delta = str(tmp_path / 'delta.csv')
+    with open(delta, 'w') as f:
+        f.writelines([rows[0]] + rows[-10:])
+    first, _ = ingest(sales, [delta])
+    stat = os.stat(delta)
+    os.utime(delta, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    parts = data_loader._read_meta(sales)['parts']
+    again, error = ingest(sales, [delta])
+    assert error is None
+    assert data_loader._read_meta(sales)['parts'] == parts
+    pd.testing.assert_frame_equal(again, first)
@@ -0,0 +1,98 @@
+"""
+Point budgets of the chart data layer: LTTB downsampling of line charts and
+server-side binning of distributions.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from charts import downsample, histogram, lttb
+
+
+def wave(n, seed=0):
+    rng = np.random.default_rng(seed)
+    x = np.arange(n, dtype='float64')
+    return x, np.sin(x / 50) + rng.normal(0, 0.1, n)
+
+
+@pytest.mark.parametrize('n', [0, 1, 2, 10, 100])
+def test_series_within_budget_is_kept(n):
+    x, y = wave(n)
+    np.testing.assert_array_equal(lttb(x, y, 100), np.arange(n))
+    frame = pd.DataFrame({'x': x, 'y': y})
+    assert downsample(frame, 'x', 'y', max_points=100) is frame
+
+
+@pytest.mark.parametrize('n_out', [3, 10, 500])
+def test_budget_keeps_first_last_and_order(n_out):
+    x, y = wave(5_000)
+    keep = lttb(x, y, n_out)
+    assert len(keep) == n_out
+    assert keep[0] == 0 and keep[-1] == len(y) - 1
+    assert (np.diff(keep) > 0).all()
+
+
+def test_spike_is_kept():
+    x, y = wave(5_000)
+    y[2_345] = 100
+    assert 2_345 in lttb(x, y, 50)
+
+
+def test_missing_values_are_skipped():
+    x, y = wave(5_000)
+    y[1_000:3_000] = np.nan
+    keep = lttb(x, y, 200)
+    assert len(keep) == 200 and (np.diff(keep) > 0).all()
+    # Buckets only hold missing values inside the run; everywhere else a
+    # value is kept
+    outside = (keep < 1_000) | (keep >= 3_000)
+    assert np.isfinite(y[keep[outside]]).all()
+    assert np.isnan(y[keep[~outside]]).all()
+
+
+def test_all_missing_series():
+    x = np.arange(1_000, dtype='float64')
+    keep = lttb(x, np.full(1_000, np.nan), 20)
+    assert len(keep) == 20 and keep[0] == 0 and keep[-1] == 999
+
+
+def test_several_y_columns_keep_the_points_of_each():
+    x, y = wave(5_000)
+    frame = pd.DataFrame({'x': x, 'a': y, 'b': -y ** 3 + np.cos(x / 7)})
+    # Unsorted input comes back sorted by x
+    shuffled = frame.sample(frac=1, random_state=0)
+    result = downsample(shuffled, 'x', ['a', 'b'], max_points=300)
+    assert result['x'].is_monotonic_increasing
+    assert result['x'].iloc[0] == 0 and result['x'].iloc[-1] == 4_999
+    for col in ['a', 'b']:
+        assert set(lttb(x, frame[col].to_numpy(), 300)) <= set(result.index)
+    assert 300 < len(result) <= 600
+
+
+def test_downsample_labels_and_dates():
+    quarters = pd.period_range('1900Q1', periods=2_000, freq='Q').astype(str)
+    frame = pd.DataFrame({'Quarter': quarters, 'Price': wave(2_000)[1]})
+    result = downsample(frame, 'Quarter', 'Price', max_points=100)
+    assert len(result) == 100
+    assert result['Quarter'].iloc[[0, -1]].tolist() == [quarters[0], quarters[-1]]
+
+    frame = pd.DataFrame({'Registration': pd.date_range('2020-01-01', periods=2_000, freq='h'), 'Price': wave(2_000)[1]})
+    result = downsample(frame, 'Registration', 'Price', max_points=100)
+    assert len(result) == 100 and result['Registration'].is_monotonic_increasing
+
+
+def test_histogram_counts_finite_values():
+    values = pd.Series([1.0, 2.0, 2.5, np.nan, np.inf, 10.0, None])
+    binned = histogram(values, bins=3)
+    assert list(binned.columns) == ['bin_start', 'bin_end', 'bin_mid', 'count']
+    assert binned['count'].tolist() == [3, 0, 1]
+    assert binned['bin_start'].iloc[0] == 1.0 and binned['bin_end'].iloc[-1] == 10.0
+    np.testing.assert_allclose(binned['bin_mid'], (binned['bin_start'] + binned['bin_end']) / 2)
+
+
+def test_histogram_range_and_empty_input():
+    binned = histogram(np.arange(100), bins=10, value_range=(0, 50))
+    # Values outside the range are left out; the last bin includes its end
+    assert len(binned) == 10 and binned['count'].sum() == 51
+    empty = histogram([np.nan, np.nan])
+    assert empty.empty and list(empty.columns) == ['bin_start', 'bin_end', 'bin_mid', 'count']
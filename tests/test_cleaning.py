@@ -0,0 +1,36 @@
+"""
+The column-wise cleaners must give the same values as the original per-cell
+cleaners (kept in benchmarks/bench_cleaning.py), edge cases included.
+"""
+import pandas as pd
+import pytest
+
+from bench_cleaning import CLEANERS, EDGE_CASES, make_raw_columns
+
+
+@pytest.mark.parametrize('name', list(CLEANERS))
+@pytest.mark.parametrize('dtype', [object, 'string', 'str'])
+def test_matches_per_cell_cleaner(name, dtype):
+    per_cell, column_wise = CLEANERS[name]
+    raw = make_raw_columns(2_000, seed=1)[name]
+    expected = raw.apply(per_cell)
+    if name == 'Share':
+        expected = expected.fillna(1.0)
+    actual = column_wise(raw.astype(dtype))
+    pd.testing.assert_series_equal(actual, expected.astype('float64'), check_names=False)
+
+
+@pytest.mark.parametrize('name', list(CLEANERS))
+def test_edge_cases(name):
+    per_cell, column_wise = CLEANERS[name]
+    raw = pd.Series(EDGE_CASES[name], dtype=object)
+    expected = raw.apply(per_cell)
+    if name == 'Share':
+        expected = expected.fillna(1.0)
+    pd.testing.assert_series_equal(column_wise(raw), expected.astype('float64'), check_names=False)
+
+
+def test_already_numeric_columns_pass_through():
+    _, clean_price = CLEANERS['Price (AED)']
+    raw = pd.Series([1.5, None, 3.0])
+    pd.testing.assert_series_equal(clean_price(raw), raw, check_names=False)
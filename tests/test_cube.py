@@ -0,0 +1,76 @@
+"""
+AggregateCube roll-ups and totals must match grouping the transactions
+directly, whichever grain (or the transactions) answers the query.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import cube
+from cube import AggregateCube
+from data_loader import load_data
+from synthetic_data import write_sales
+
+
+@pytest.fixture(scope='module')
+def frame(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('cube') / 'sales.csv')
+    write_sales(path, 20_000)
+    df, error = load_data(path, use_cache=False)
+    assert error is None
+    return df
+
+
+def selections(df):
+    row = df.iloc[0]
+    return [
+        {},
+        {'District': row['District']},
+        {'District': row['District'], 'Asset Type': row['Asset Type'], 'Year': row['Year']},
+        {'District': row['District'], 'Community': row['Community']},
+        {'District': row['District'], 'Community': row['Community'], 'Project': row['Project']},
+    ]
+
+
+def direct(df, months, selection, by):
+    mask = np.ones(len(df), dtype=bool)
+    for dim, value in selection.items():
+        mask &= (df[dim] == value).to_numpy(dtype=bool, na_value=False)
+    frame = df.assign(Month=months)[mask].astype({m: 'float64' for m in cube.MEASURES})
+    grouped = frame.groupby(by, observed=True)
+    out = pd.DataFrame({'transactions': grouped.size()})
+    for measure in cube.MEASURES:
+        out[measure] = grouped[measure].mean()
+    return out.reset_index()
+
+
+@pytest.mark.parametrize('by', ['Year', 'Quarter', 'Month', 'District', 'Community', 'Project',
+                                ['Quarter', 'Asset Type', 'Sale Type']])
+def test_rollup_matches_groupby(frame, monkeypatch, by):
+    # Keep every grain regardless of size so each one is exercised
+    monkeypatch.setattr(cube, 'MAX_CELL_RATIO', 1.0)
+    agg = AggregateCube(frame)
+    assert len(agg.grains) == len(cube.CUBE_GRAINS)
+    for selection in selections(frame):
+        expected = direct(frame, agg.months, selection, by)
+        pd.testing.assert_frame_equal(agg.rollup(by, selection), expected, check_dtype=False, check_categorical=False)
+
+
+def test_totals_match_transactions(frame):
+    agg = AggregateCube(frame)
+    for selection in selections(frame):
+        mask = np.ones(len(frame), dtype=bool)
+        for dim, value in selection.items():
+            mask &= (frame[dim] == value).to_numpy(dtype=bool, na_value=False)
+        rows = frame[mask]
+        totals = agg.totals(selection)
+        assert totals['transactions'] == len(rows)
+        assert totals['dated'] == rows['Year'].notna().sum()
+        for measure in cube.MEASURES:
+            assert np.isclose(totals[measure], rows[measure].astype('float64').mean())
+
+
+def test_grains_stay_coarse(frame):
+    agg = AggregateCube(frame)
+    for dims, cells, _ in agg.grains:
+        assert len(cells) <= cube.MAX_CELL_RATIO * len(frame)
@@ -0,0 +1,54 @@
+"""
+FilterIndex against plain pandas masks, and its memos under concurrent use.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import filter_index
+from filter_index import FilterIndex
+
+
+@pytest.fixture(scope='module')
+def frame():
+    rng = np.random.default_rng(0)
+    n = 5_000
+    return pd.DataFrame({
+        'District': pd.Categorical(rng.choice(['D1', 'D2', 'D3'], n)),
+        'Community': pd.Categorical(rng.choice([f'C{i}' for i in range(12)], n)),
+        'Year': pd.array(rng.choice([2022, 2023, 2024], n), dtype='Int16'),
+    })
+
+
+def selections(df):
+    for district in ['D1', 'D2', 'D3', 'D9']:
+        for year in ['All', 2023]:
+            yield {'District': district, 'Year': year}
+
+
+def test_rows_and_options_match_masks(frame):
+    index = FilterIndex(frame)
+    for selection in selections(frame):
+        mask = np.ones(len(frame), dtype=bool)
+        for dim, value in selection.items():
+            if value != "All":
+                mask &= (frame[dim] == value).to_numpy(dtype=bool, na_value=False)
+        np.testing.assert_array_equal(index.rows(selection), np.flatnonzero(mask))
+        assert index.options('Community', selection) == sorted(frame.loc[mask, 'Community'].unique())
+
+
+def test_memos_are_thread_safe(frame, monkeypatch):
+    # A tiny bound makes every call evict, which is where unguarded dicts broke
+    monkeypatch.setattr(filter_index, 'MAX_CACHED_SELECTIONS', 2)
+    index = FilterIndex(frame)
+    specs = list(selections(frame)) * 200
+
+    def work(selection):
+        index.rows(selection)
+        return index.options('Community', selection)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(work, specs))
+    assert results[:len(specs) // 200] == [index.options('Community', s) for s in list(selections(frame))]
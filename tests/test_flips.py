@@ -0,0 +1,115 @@
+"""
+FlipEngine against the per-view pandas algorithm it replaced: filter the
+rows, sort by property and date, and pair each sale with the previous one
+through groupby().shift.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_loader import load_data
+from flips import HOLDING_WINDOWS, MIN_MARKET_PRICE, APPRECIATION_RANGE, PROPERTY_COLS, FlipEngine
+from filter_index import FilterIndex
+from indicators import INCOMPLETE_QUARTER
+from synthetic_data import write_sales
+
+
+def baseline_stats(df, window_days):
+    df_sorted = df.sort_values(by=PROPERTY_COLS + ['Registration'])
+    df_sorted['is_resale'] = (df_sorted['Sequence'] == 'Secondary')
+    df_sorted['prev_reg'] = df_sorted.groupby(PROPERTY_COLS, observed=True)['Registration'].shift(1)
+    df_sorted['prev_price'] = df_sorted.groupby(PROPERTY_COLS, observed=True)['Price (AED)'].shift(1)
+    df_sorted['days_since_last'] = (df_sorted['Registration'] - df_sorted['prev_reg']).dt.days
+    df_sorted['is_flip'] = df_sorted['is_resale'] & (df_sorted['days_since_last'] > 0) & (df_sorted['days_since_last'] <= window_days)
+    df_sorted['appreciation'] = (df_sorted['Price (AED)'] - df_sorted['prev_price']) / df_sorted['prev_price'].replace(0, np.nan)
+    resale_stats = df_sorted.groupby('Quarter', observed=True).agg(total_resales=('is_resale', 'sum'), flips=('is_flip', 'sum')).reset_index()
+    resale_stats['Flip Rate (%)'] = (resale_stats['flips'] / resale_stats['total_resales'].replace(0, 1)) * 100
+    flips_only = df_sorted[(df_sorted['is_flip']) & (df_sorted['Price (AED)'] > MIN_MARKET_PRICE) & (df_sorted['prev_price'] > MIN_MARKET_PRICE)]
+    low, high = APPRECIATION_RANGE
+    flips_only = flips_only[(flips_only['appreciation'] < high) & (flips_only['appreciation'] > low)]
+    apprec_stats = flips_only.groupby('Quarter', observed=True)['appreciation'].mean().reset_index()
+    apprec_stats['Flip Price Appreciation (%)'] = apprec_stats['appreciation'] * 100
+    flip_df = resale_stats[resale_stats['Quarter'] != INCOMPLETE_QUARTER].sort_values('Quarter')
+    apprec_df = apprec_stats[apprec_stats['Quarter'] != INCOMPLETE_QUARTER].sort_values('Quarter')
+    return flip_df, apprec_df
+
+
+def assert_same(result, expected):
+    expected = expected.astype({'Quarter': str}).reset_index(drop=True)
+    pd.testing.assert_frame_equal(result.reset_index(drop=True), expected, check_dtype=False, rtol=1e-9)
+
+
+@pytest.fixture(scope='module')
+def frame(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('flips') / 'sales.csv')
+    write_sales(path, 20_000)
+    df, error = load_data(path, use_cache=False)
+    assert error is None
+    # Missing dates sort after the dated sales of their property
+    df.loc[df.index[::97], 'Registration'] = pd.NaT
+    return df
+
+
+def selections(df):
+    district = df['District'].value_counts().index[0]
+    yield {}
+    yield {'District': district}
+    for year in sorted(df['Year'].dropna().unique()):
+        yield {'District': district, 'Year': year}
+
+
+def test_frame_covers_the_edge_cases(frame):
+    engine = FlipEngine(frame)
+    assert (engine.property_key == -1).any()
+    assert frame['Registration'].isna().any()
+    assert engine.stats(window_days=min(HOLDING_WINDOWS))[0]['flips'].sum() > 100
+
+
+def test_previous_sale_matches_shift(frame):
+    # Unpaired where a property attribute is missing, and a sale without a
+    # date follows the dated sales of its property
+    engine = FlipEngine(frame)
+    df_sorted = frame.sort_values(by=PROPERTY_COLS + ['Registration'])
+    prev_price = df_sorted.groupby(PROPERTY_COLS, observed=True)['Price (AED)'].shift(1).sort_index()
+    prev_reg = df_sorted.groupby(PROPERTY_COLS, observed=True)['Registration'].shift(1).sort_index()
+    price = frame['Price (AED)'].to_numpy()
+    np.testing.assert_array_equal(engine.prev >= 0, df_sorted.groupby(PROPERTY_COLS, observed=True).cumcount().sort_index().to_numpy() > 0)
+    has_prev = engine.prev >= 0
+    np.testing.assert_array_equal(price[engine.prev[has_prev]], prev_price.to_numpy()[has_prev])
+    np.testing.assert_array_equal(engine.days_since_last, (frame['Registration'] - prev_reg).dt.days.to_numpy(dtype='float32', na_value=np.nan))
+
+
+@pytest.mark.parametrize('window_days', HOLDING_WINDOWS)
+def test_stats_match_baseline(frame, window_days):
+    engine = FlipEngine(frame)
+    index = FilterIndex(frame)
+    for selection in selections(frame):
+        mask = np.ones(len(frame), dtype=bool)
+        for dim, value in selection.items():
+            mask &= (frame[dim] == value).to_numpy(dtype=bool, na_value=False)
+        flip_df, apprec_df = engine.stats(index.rows(selection), window_days, same_year_only='Year' in selection)
+        expected_flips, expected_apprec = baseline_stats(frame[mask], window_days)
+        assert_same(flip_df, expected_flips)
+        assert_same(apprec_df, expected_apprec)
+
+
+def test_year_filter_only_pairs_sales_of_that_year():
+    # Bought in December, resold in January: a flip across the year boundary
+    # counts for the whole timeline but not within the January sale's year
+    df = pd.DataFrame({
+        'Sold Area (sqm)': [100.0] * 3, 'Plot Area (sqm)': [200.0] * 3, 'Layout': ['2 Beds'] * 3,
+        'District': ['North'] * 3, 'Community': ['N1'] * 3, 'Project': ['P1'] * 3,
+        'Sequence': ['Primary', 'Secondary', 'Secondary'],
+        'Registration': pd.to_datetime(['2023-12-20', '2024-01-10', '2024-03-01']),
+        'Price (AED)': [1e6, 1.1e6, 1.2e6],
+    })
+    df['Year'] = df['Registration'].dt.year
+    df['Quarter'] = df['Registration'].dt.to_period('Q').astype(str)
+    engine = FlipEngine(df)
+    rows = np.array([1, 2])
+    flip_df, _ = engine.stats(rows, 90)
+    assert flip_df['flips'].tolist() == [2]
+    flip_df, apprec_df = engine.stats(rows, 90, same_year_only=True)
+    assert_same(flip_df, baseline_stats(df.iloc[rows], 90)[0])
+    assert flip_df['flips'].tolist() == [1]
+    assert apprec_df['appreciation'].tolist() == pytest.approx([1.2 / 1.1 - 1])
@@ -0,0 +1,71 @@
+"""
+RunTimer stages, and cProfile shared between concurrent runs.
+"""
+import sys
+import threading
+
+import profiling
+from profiling import RunTimer, stage
+
+
+def profiler_enabled():
+    # cProfile uses sys.monitoring from Python 3.12, sys.setprofile before
+    if hasattr(sys, 'monitoring'):
+        return sys.monitoring.get_tool(sys.monitoring.PROFILER_ID) is not None
+    return sys.getprofile() is not None
+
+
+def test_stages_nest_in_report():
+    with RunTimer() as timer:
+        with stage('outer'):
+            with stage('inner'):
+                pass
+    report = timer.report()
+    assert list(report['Stage']) == ['outer', '  inner', '(other)']
+    assert (report['ms'] >= 0).all()
+
+
+def test_one_profiled_run_at_a_time():
+    first = RunTimer(profile=True).start()
+    result = {}
+
+    def other_session():
+        second = RunTimer(profile=True).start()
+        second.stop()
+        result['skipped'] = second.profile_skipped
+        result['stats'] = second.profile_stats()
+
+    thread = threading.Thread(target=other_session)
+    thread.start()
+    thread.join()
+    first.stop()
+    assert result == {'skipped': True, 'stats': None}
+    assert first.profile_stats() is not None
+
+    # Free again once the first run stopped
+    third = RunTimer(profile=True).start()
+    third.stop()
+    assert not third.profile_skipped
+
+
+def test_interrupted_run_releases_profiler_on_next_run():
+    RunTimer(profile=True).start()  # never stopped, like a rerun cut short
+    timer = RunTimer(profile=True).start()
+    timer.stop()
+    assert not timer.profile_skipped
+    assert timer.profile_stats() is not None
+    assert profiling._profiling is None
+
+
+def test_unprofiled_run_stops_interrupted_profiled_run():
+    interrupted = RunTimer(profile=True).start()  # never stopped, like a rerun cut short
+    assert profiler_enabled()
+    timer = RunTimer().start()
+    timer.stop()
+    assert not profiler_enabled()
+    assert profiling._profiling is None
+    # Stages after the run (e.g. fragment reruns) are not recorded in either timer
+    with stage('fragment'):
+        pass
+    assert interrupted.stages == [] and timer.stages == []
+    assert getattr(profiling._active, 'timer', None) is None
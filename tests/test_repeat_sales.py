@@ -0,0 +1,146 @@
+"""
+Repeat-sales index: recovery of a known price drift, and incremental
+updates that match a rebuild even after the cache moved rows around.
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+import data_loader
+from analytics import DashboardAnalytics
+from data_loader import ingest, transaction_keys
+from flips import FlipEngine
+from repeat_sales import RepeatSalesIndex
+from synthetic_data import write_sales
+
+# Quarterly log drift per district
+DRIFTS = {'North': 0.02, 'South': -0.01}
+QUARTERS = pd.period_range('2021Q1', '2024Q4', freq='Q')
+
+
+def drifting_sales(units=300, sales_per_unit=4, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for district, drift in DRIFTS.items():
+        for unit in range(units):
+            base = rng.uniform(5e5, 3e6)
+            for q in np.sort(rng.choice(len(QUARTERS), sales_per_unit, replace=False)):
+                quarter = QUARTERS[q]
+                rows.append({
+                    'District': district, 'Community': f'{district} {unit % 3}', 'Project': f'P{unit}',
+                    'Asset Type': 'Residential', 'Layout': '2 Beds', 'Sold Area (sqm)': 100.0 + unit,
+                    'Plot Area (sqm)': 200.0 + unit, 'Sequence': 'Secondary',
+                    'Registration': quarter.start_time + pd.Timedelta(days=int(rng.integers(0, 80))),
+                    'Price (AED)': base * np.exp(drift * q),
+                })
+    df = pd.DataFrame(rows)
+    df['Rate (AED/sqm)'] = df['Price (AED)'] / df['Sold Area (sqm)']
+    df['Property Type'], df['Sale Type'] = 'Apartment', 'Ready'
+    df['Year'] = df['Registration'].dt.year
+    df['Quarter'] = df['Registration'].dt.to_period('Q').astype(str)
+    return data_loader.compact_frame(df)
+
+
+def test_recovers_drift():
+    df = drifting_sales()
+    index = RepeatSalesIndex(df, FlipEngine(df))
+    for district, drift in DRIFTS.items():
+        result = index.index(district)
+        assert len(result) == len(QUARTERS)
+        steps = [QUARTERS.get_loc(pd.Period(q, 'Q')) for q in result['Quarter']]
+        expected = 100 * np.exp(drift * (np.array(steps) - steps[0]))
+        np.testing.assert_allclose(result['Repeat-Sales Index'], expected, rtol=1e-6)
+
+
+def segments(df):
+    districts = sorted(df['District'].dropna().unique())
+    return [("All", "All", "All")] + [(d, "All", "All") for d in districts] + [(districts[0], "All", "Residential")]
+
+
+def assert_same_index(updated, rebuilt, segment):
+    pd.testing.assert_frame_equal(updated.index(*segment), rebuilt.index(*segment), check_dtype=False, rtol=1e-6)
+
+
+def test_update_matches_rebuild_after_compaction(tmp_path, monkeypatch):
+    # Every ingest compacts: sales-file rows first, then delta rows, so the
+    # delta rows move behind the appended ones
+    monkeypatch.setattr(data_loader, 'MAX_CACHE_PARTS', 1)
+    source = str(tmp_path / 'source.csv')
+    write_sales(source, 6_000)
+    raw = pd.read_csv(source, dtype=str, keep_default_na=False)
+    # Chronological, so later batches only add pairs at the end of each property's history
+    raw = raw.iloc[np.argsort(pd.to_datetime(raw['Registration'], dayfirst=True, errors='coerce').to_numpy(), kind='stable')]
+
+    sales, delta = str(tmp_path / 'sales.csv'), str(tmp_path / 'delta.csv')
+    raw.iloc[:4_000].to_csv(sales, index=False)
+    raw.iloc[4_000:4_500].to_csv(delta, index=False)
+    df, error = ingest(sales, [delta])
+    assert error is None
+    index = RepeatSalesIndex(df, FlipEngine(df))
+    for segment in segments(df):
+        index.index(*segment)
+    delta_rows = df.iloc[4_000:].reset_index(drop=True)
+
+    raw.iloc[4_500:].to_csv(sales, mode='a', header=False, index=False)
+    df, error = ingest(sales, [delta])
+    assert error is None
+    assert len(df) == len(raw)
+    # The delta rows now come last
+    np.testing.assert_array_equal(transaction_keys(df.iloc[-len(delta_rows):]), transaction_keys(delta_rows))
+
+    flips = FlipEngine(df)
+    updated = index.updated(df, flips)
+    rebuilt = RepeatSalesIndex(df, flips)
+    # Matched by transaction keys, the moved rows keep their pairs, so the
+    # cached segments are updated rather than rebuilt
+    assert set(updated._cache) == set(segments(df))
+    for segment in segments(df):
+        assert_same_index(updated, rebuilt, segment)
+    # The index being updated from is left as it was
+    assert index.n_rows == 4_500
+
+
+def test_update_rebuilds_segments_that_lost_a_pair():
+    df = drifting_sales(units=100)
+    # Hold back one sale in the middle of a North unit's history
+    north = np.flatnonzero((df['Project'] == 'P1').to_numpy() & (df['District'] == 'North').to_numpy())
+    middle = north[np.argsort(df['Registration'].to_numpy()[north])][1]
+    old = df.drop(index=middle).reset_index(drop=True)
+    index = RepeatSalesIndex(old, FlipEngine(old))
+    for segment in [("North", "All", "All"), ("South", "All", "All")]:
+        index.index(*segment)
+
+    flips = FlipEngine(df)
+    index.update(df, flips)
+    # The late sale splits a North pair; South is untouched
+    assert ("North", "All", "All") not in index._cache
+    assert ("South", "All", "All") in index._cache
+    rebuilt = RepeatSalesIndex(df, flips)
+    for segment in [("North", "All", "All"), ("South", "All", "All")]:
+        assert_same_index(index, rebuilt, segment)
+
+
+@pytest.mark.parametrize('district', list(DRIFTS))
+def test_updated_index_keeps_recovering_drift(district):
+    df = drifting_sales(units=200)
+    cut = df['Registration'] < pd.Timestamp('2023-01-01')
+    old = df[cut.to_numpy()].reset_index(drop=True)
+    index = RepeatSalesIndex(old, FlipEngine(old))
+    index.index(district)
+    index.update(df, FlipEngine(df))
+    assert (district, "All", "All") in index._cache
+    assert_same_index(index, RepeatSalesIndex(df, FlipEngine(df)), (district, "All", "All"))
+
+
+def test_refreshed_analytics_carry_the_index_over():
+    df = drifting_sales(units=100)
+    old = df[(df['Registration'] < pd.Timestamp('2023-01-01')).to_numpy()].reset_index(drop=True)
+    previous = DashboardAnalytics(old)
+    previous.repeat_sales_index({'District': 'North'})
+    refreshed = DashboardAnalytics(df)
+    refreshed.carry_over(previous)
+    assert refreshed._repeat_sales is not previous._repeat_sales
+    assert previous._repeat_sales.n_rows == len(old)
+    pd.testing.assert_frame_equal(refreshed.repeat_sales_index({'District': 'North'}),
+                                  DashboardAnalytics(df).repeat_sales_index({'District': 'North'}),
+                                  check_dtype=False, rtol=1e-6)
@@ -0,0 +1,19 @@
+"""
+Sharded sources load the same in worker processes as in-process.
+"""
+import pandas as pd
+
+from data_loader import load_data
+from synthetic_data import write_sales
+
+
+def test_parallel_shards_match_serial(tmp_path):
+    directory = tmp_path / 'shards'
+    write_sales(str(directory) + '/', 6_000, shards=3)
+    calls = []
+    parallel, error = load_data(str(directory), workers=2, progress=lambda done, text: calls.append(done))
+    assert error is None
+    serial, error = load_data(str(directory), use_cache=False, workers=1)
+    assert error is None
+    pd.testing.assert_frame_equal(parallel, serial)
+    assert calls[-1] == 1.0
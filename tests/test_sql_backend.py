@@ -0,0 +1,67 @@
+"""
+The DuckDB backend must give the same results as the pandas analytics for
+every dashboard view, and share one database file per version of the data.
+"""
+import os
+
+import pytest
+
+pytest.importorskip('duckdb')
+
+from analytics import DashboardAnalytics
+from bench_sql_backend import sample_selections, same, views
+from data_loader import cache_key, ingest, load_data
+from sql_backend import DuckDBAnalytics
+from synthetic_data import write_sales
+
+
+@pytest.fixture(scope='module')
+def frame(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('sql') / 'sales.csv')
+    write_sales(path, 5_000)
+    df, error = load_data(path, use_cache=False)
+    assert error is None
+    return df
+
+
+def test_views_match_pandas(frame, tmp_path):
+    pandas_backend = DashboardAnalytics(frame)
+    sql_backend = DuckDBAnalytics(frame, str(tmp_path))
+    for selection in sample_selections(pandas_backend, 8):
+        for (name, run_pandas), (_, run_sql) in zip(views(pandas_backend, selection), views(sql_backend, selection)):
+            try:
+                same(run_pandas(), run_sql())
+            except AssertionError as e:
+                raise AssertionError(f"{name} for {selection}: {e}") from e
+
+
+def test_database_shared_and_rebuilt_on_change(tmp_path):
+    path = str(tmp_path / 'sales.csv')
+    write_sales(path, 2_000)
+    df, error = ingest(path)
+    assert error is None
+    directory = str(tmp_path / 'db')
+    loads = []
+
+    def load():
+        loads.append(1)
+        return ingest(path)[0]
+
+    first = DuckDBAnalytics(df, directory, key=cache_key(path), load=load)
+    # Built once, then opened read-only by every instance for the same data
+    second = DuckDBAnalytics(df, directory, key=cache_key(path), load=load)
+    assert second.db_path == first.db_path
+    assert first.n_rows == len(df) and first._df is None
+    first.repeat_sales_index({})
+    assert len(loads) == 1
+
+    with open(path, 'a') as f:
+        with open(path) as source:
+            f.write(source.readlines()[1])
+    df, error = ingest(path)
+    assert error is None
+    changed = DuckDBAnalytics(df, directory, key=cache_key(path), load=load)
+    assert changed.db_path != first.db_path
+    assert changed.n_rows == len(df) == first.n_rows + 1
+    # The file for the old data is removed
+    assert not os.path.exists(first.db_path)